@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""Measures batch mode throughput and scaling with --jobs.
+
+Signs a synthetic list of urls with generate_batch for each job count and
+prints urls/s and the speedup over the first job count.
+"""
+import os
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from thumbor_url_generator.batch import generate_batch  # noqa: E402
+
+
+def synthetic_records(count: int) -> list:
+    """Returns count batch records spread over a few hosts."""
+    return [
+        {"url": f"https://cdn{i % 16}.example.com/catalogue/{i}/image-{i}.jpg"}
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--count", type=int, default=200_000)
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+        help="Job counts to measure",
+    )
+    args = parser.parse_args()
+
+    records = synthetic_records(args.count)
+    base_rate = None
+    with open(os.devnull, "w") as out_file:
+        for jobs in args.jobs:
+            start = time.perf_counter()
+            generate_batch(
+                records,
+                out_file,
+                "https://thumbor.example.com",
+                "bench-key",
+                300,
+                200,
+                jobs=jobs,
+            )
+            rate = args.count / (time.perf_counter() - start)
+            base_rate = base_rate or rate
+            print(f"jobs={jobs:<3} {rate:>12,.0f} urls/s  x{rate / base_rate:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""Deterministic synthetic corpus of realistic source image urls.
+
+The corpus spreads over many hosts and mixes plain catalogue paths, unicode
+path segments, spaces and long tracking query strings. Run as a script to
+write one url per line, e.g. ``python benchmarks/corpus.py -n 100000``.
+"""
+import random
+import sys
+from argparse import ArgumentParser
+from typing import List
+
+WORDS = [
+    "catalogue", "product", "images", "media", "static", "assets", "uploads",
+    "large", "thumb", "hero", "gallery", "summer", "sale", "2024", "v2",
+]
+UNICODE_WORDS = [
+    "画像", "写真", "produkt", "größe", "café", "каталог", "صورة", "🙂",
+]
+TLDS = ["com", "net", "io", "co.uk", "de", "jp"]
+EXTENSIONS = ["jpg", "jpeg", "png", "webp", "gif"]
+
+
+def make_hosts(rng: random.Random, count: int) -> List[str]:
+    return [
+        f"{rng.choice(['cdn', 'img', 'static', 'media'])}{i}."
+        f"{rng.choice(WORDS)}-{rng.randint(1, 999)}.example.{rng.choice(TLDS)}"
+        for i in range(count)
+    ]
+
+
+def make_url(rng: random.Random, hosts: List[str]) -> str:
+    """Returns one url from the mix of path and query shapes."""
+    segments = [rng.choice(WORDS) for _ in range(rng.randint(1, 5))]
+    if rng.random() < 0.2:
+        segments.insert(rng.randrange(len(segments) + 1), rng.choice(UNICODE_WORDS))
+    name = f"{rng.choice(WORDS)}-{rng.randint(1, 10**7)}"
+    if rng.random() < 0.1:
+        name += f" ({rng.randint(1, 9)})"
+    url = (
+        f"{rng.choice(['https', 'http'])}://{rng.choice(hosts)}/"
+        f"{'/'.join(segments)}/{name}.{rng.choice(EXTENSIONS)}"
+    )
+    shape = rng.random()
+    if shape < 0.3:
+        url += f"?v={rng.randint(1, 100)}"
+    elif shape < 0.45:
+        params = [
+            f"{rng.choice(WORDS)}_{i}={rng.getrandbits(64):x}"
+            for i in range(rng.randint(5, 30))
+        ]
+        url += "?" + "&".join(params)
+    return url
+
+
+def generate_corpus(count: int, seed=0, host_count=500) -> List[str]:
+    """Returns count urls; the same arguments always give the same corpus."""
+    rng = random.Random(seed)
+    hosts = make_hosts(rng, host_count)
+    return [make_url(rng, hosts) for _ in range(count)]
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--count", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--hosts", type=int, default=500)
+    args = parser.parse_args()
+    for url in generate_corpus(args.count, args.seed, args.hosts):
+        sys.stdout.write(url + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""Checks quote_url against the original encode_url and compares their speed.
+
+The reference is the original implementation,
+``urllib.parse.quote(url).replace("/", "%2F")``. Every url of a random corpus
+(ascii, unicode, control characters, astral code points, with and without a
+scheme://host prefix) must encode identically as str and as utf-8 bytes;
+the script exits non-zero on the first mismatch and then times both.
+"""
+import random
+import sys
+import timeit
+from argparse import ArgumentParser
+from pathlib import Path
+from urllib import parse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from thumbor_url_generator.encoding import UrlEncoder  # noqa: E402
+
+PREFIXES = ["", "https://", "http://cdn.example.com/", "//host/", "s3://bucket/", "a//"]
+
+
+def reference(url) -> str:
+    return parse.quote(url).replace("/", "%2F")
+
+
+def random_url(rng: random.Random) -> str:
+    """Returns a random url mixing ascii, BMP and astral characters."""
+    chars = []
+    for _ in range(rng.randint(0, 80)):
+        kind = rng.random()
+        if kind < 0.7:
+            chars.append(chr(rng.randint(0, 127)))
+        elif kind < 0.95:
+            code = rng.randint(0x80, 0xFFFF)
+            chars.append(chr(code if not 0xD800 <= code <= 0xDFFF else 0xFFFD))
+        else:
+            chars.append(chr(rng.randint(0x10000, 0x10FFFF)))
+    return rng.choice(PREFIXES) + "".join(chars)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=int, default=200_000)
+    parser.add_argument("-n", "--number", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    encoder = UrlEncoder()
+    for _ in range(args.corpus):
+        url = random_url(rng)
+        for value in (url, url.encode("utf-8")):
+            if encoder(value) != reference(value):
+                sys.exit(f"Mismatch for {value!r}")
+    print(f"identical output for {args.corpus} urls (str and bytes)")
+
+    samples = [
+        "https://cdn3.example.com/catalogue/12345/product-image.jpg?v=3&size=xl",
+        "https://images.a-rather-long-hostname.example.co.uk/a/b.png",
+        "https://例え.jp/画像/写真 1.jpeg",
+    ]
+    for url in samples:
+        times = {}
+        for name, func in (("encode_url", reference), ("quote_url", encoder)):
+            best = min(timeit.repeat(lambda: func(url), number=args.number, repeat=5))
+            times[name] = best / args.number * 1e6
+        print(
+            f"{times['encode_url']:.2f} -> {times['quote_url']:.2f} us"
+            f"  x{times['encode_url'] / times['quote_url']:.2f}  {url}"
+        )
+
+
+if __name__ == "__main__":
+    main()
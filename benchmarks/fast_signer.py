@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""Compares FastCryptoURL with libthumbor's CryptoURL for output and speed.
+
+First checks that both produce byte-identical signed paths (or both reject
+the options) over a grid of widths, heights, smart and fit-in flags and
+encoded source urls (exits non-zero on the
+first mismatch), then times CryptoURL.generate against FastCryptoURL.generate.
+"""
+import sys
+import timeit
+from argparse import ArgumentParser
+from itertools import product
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from libthumbor import CryptoURL  # noqa: E402
+
+from thumbor_url_generator.generator import encode_url  # noqa: E402
+from thumbor_url_generator.signer import FastCryptoURL  # noqa: E402
+
+KEYS = ["secret", "clé-üñï", "k" * 200]
+SIZES = [0, 1, 200, 1600, "0", "300", ""]
+SOURCES = [
+    "https://example.com/image.jpg",
+    "http://cdn.example.com/a/b/c.png?size=large&v=2#frag",
+    "https://例え.jp/画像/写真 1.jpeg",
+    "s3://bucket/key with spaces/~tilde.webp",
+    "https://example.com/" + "x" * 2000,
+]
+
+
+def generate_or_error(crypto, options: dict) -> str:
+    """Returns the signed path, or the ValueError message for bad options."""
+    try:
+        return crypto.generate(**options)
+    except ValueError as err:
+        return f"ValueError: {err}"
+
+
+def check_identical() -> int:
+    """Returns the number of option combinations compared."""
+    checked = 0
+    for key in KEYS:
+        reference, fast = CryptoURL(key=key), FastCryptoURL(key=key)
+        for width, height, smart, fit_in, source in product(
+            SIZES, SIZES, (True, False), (True, False), SOURCES
+        ):
+            options = dict(
+                width=width,
+                height=height,
+                smart=smart,
+                fit_in=fit_in,
+                image_url=encode_url(source),
+            )
+            expected = generate_or_error(reference, options)
+            actual = generate_or_error(fast, options)
+            if expected != actual:
+                sys.exit(f"Mismatch for {options}:\n  {expected}\n  {actual}")
+            checked += 1
+    return checked
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--number", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"identical output for {check_identical()} combinations")
+    options = dict(
+        width=300, height=200, smart=True, image_url=encode_url(SOURCES[1])
+    )
+    timings = {}
+    for name, crypto in (
+        ("libthumbor CryptoURL", CryptoURL(key="secret")),
+        ("FastCryptoURL", FastCryptoURL(key="secret")),
+    ):
+        seconds = timeit.timeit(
+            lambda: crypto.generate(**options), number=args.number
+        )
+        timings[name] = seconds / args.number * 1e6
+        print(f"{name:<22} {timings[name]:.2f} us/url")
+    print(f"speedup x{timings['libthumbor CryptoURL'] / timings['FastCryptoURL']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""Measures POST /sign latency of the HTTP endpoint over a keep-alive connection.
+
+Starts the endpoint in a background thread on a free local port, sends
+single-url requests over one http.client connection and prints latency
+percentiles, then the per-url cost of larger batch requests. With
+--background-batch N, another connection keeps posting batches of N
+records while the single-url requests are timed.
+"""
+import asyncio
+import http.client
+import json
+import logging
+import socket
+import sys
+import threading
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from thumbor_url_generator import ThumborUrlGenerator  # noqa: E402
+from thumbor_url_generator.http_server import (  # noqa: E402
+    HttpSigningServer,
+    serve_http,
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(samples: list, pct: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--requests", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--background-batch", type=int, default=0)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    port = free_port()
+    server = HttpSigningServer(
+        ThumborUrlGenerator("https://thumbor.example.com", "bench-key"),
+        (300, 200, True, False),
+    )
+    threading.Thread(
+        target=asyncio.run, args=(serve_http("127.0.0.1", port, server),), daemon=True
+    ).start()
+    time.sleep(0.5)
+
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    headers = {"Content-Type": "application/json"}
+
+    def sign(records: list) -> list:
+        connection.request("POST", "/sign", json.dumps(records), headers)
+        return json.loads(connection.getresponse().read())
+
+    done = threading.Event()
+
+    def post_batches():
+        background = http.client.HTTPConnection("127.0.0.1", port)
+        body = json.dumps(
+            [
+                {"url": f"https://cdn.example.com/background/{i}.jpg"}
+                for i in range(args.background_batch)
+            ]
+        )
+        while not done.is_set():
+            background.request("POST", "/sign", body, headers)
+            background.getresponse().read()
+
+    if args.background_batch:
+        threading.Thread(target=post_batches, daemon=True).start()
+        time.sleep(0.2)
+
+    samples = []
+    for i in range(args.requests):
+        body = [{"url": f"https://cdn.example.com/catalogue/{i}.jpg"}]
+        start = time.perf_counter()
+        sign(body)
+        samples.append((time.perf_counter() - start) * 1e3)
+    done.set()
+    print(f"single-url requests: {args.requests}")
+    for pct in (50, 90, 99, 99.9):
+        print(f"  p{pct:<5} {percentile(samples, pct):.3f} ms")
+
+    body = [
+        {"url": f"https://cdn.example.com/catalogue/{i}.jpg"}
+        for i in range(args.batch_size)
+    ]
+    start = time.perf_counter()
+    rounds = 20
+    for _ in range(rounds):
+        sign(body)
+    per_url = (time.perf_counter() - start) / (rounds * args.batch_size) * 1e6
+    print(f"batch of {args.batch_size}: {per_url:.2f} us/url")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""Measures the cold import time of thumbor_url_generator against a budget.
+
+Each sample runs a fresh interpreter with ``-X importtime`` and the best of
+``--runs`` samples is compared with ``--budget-ms``. Also checks that the
+import leaves logging unconfigured and does not pull in pyperclip or dotenv.
+Exits non-zero when the budget is exceeded or a side effect is detected.
+"""
+import subprocess
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PACKAGE = "thumbor_url_generator"
+SIDE_EFFECT_CHECK = (
+    "import logging, sys\n"
+    f"import {PACKAGE}\n"
+    "assert not logging.getLogger().handlers, 'root logger was configured'\n"
+    "for name in ('pyperclip', 'dotenv'):\n"
+    "    assert name not in sys.modules, name + ' imported eagerly'\n"
+)
+
+
+def import_time_us() -> int:
+    """Returns the cumulative import time of the package in microseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {PACKAGE}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == PACKAGE:
+            return int(fields[1])
+    raise RuntimeError(f"{PACKAGE} not found in -X importtime output")
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Number of samples")
+    parser.add_argument(
+        "--budget-ms", type=float, default=50.0, help="Import time budget in ms"
+    )
+    args = parser.parse_args()
+
+    subprocess.run([sys.executable, "-c", SIDE_EFFECT_CHECK], cwd=ROOT, check=True)
+    best_ms = min(import_time_us() for _ in range(args.runs)) / 1000
+    print(f"import {PACKAGE}: {best_ms:.1f} ms (budget {args.budget_ms:.1f} ms)")
+    if best_ms > args.budget_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""Compares the mmap bytes reader with plain text line iteration.
+
+Writes synthetic url files (the mixed unicode corpus and plain ascii
+catalogue urls), then times reading each (text mode ``for line in file``, as
+for stdin, against iter_lines over an mmap) and signing it end to end
+(read_batch + generate_batch against generate_batch_mmap). Both signing
+paths must produce the same output; the script exits non-zero otherwise.
+"""
+import io
+import logging
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from corpus import generate_corpus  # noqa: E402
+
+from thumbor_url_generator.batch import (  # noqa: E402
+    generate_batch,
+    make_generator,
+    read_batch,
+)
+from thumbor_url_generator.mmap_reader import (  # noqa: E402
+    generate_batch_mmap,
+    iter_lines,
+)
+from thumbor_url_generator.presets import Preset  # noqa: E402
+
+BASE_URL = "https://thumbor.example.com"
+KEY = "bench-key"
+
+
+def read_text(path) -> int:
+    count = 0
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                count += 1
+    return count
+
+
+def read_mmap(path) -> int:
+    return sum(1 for line in iter_lines(path) if line)
+
+
+def sign_text(path) -> bytes:
+    out = io.StringIO()
+    with open(path, encoding="utf-8") as file:
+        generate_batch(read_batch(file), out, BASE_URL, KEY, 300, 200)
+    return out.getvalue().encode("utf-8")
+
+
+def sign_mmap(path) -> bytes:
+    out = io.BytesIO()
+    generator = make_generator(BASE_URL, KEY)
+    preset = Preset("300x200", "300", "200", True)
+    generate_batch_mmap(path, out, generator, preset, (300, 200, True, False, None))
+    return out.getvalue()
+
+
+def best_of(func, path, repeat: int):
+    """Returns the best time and the last result of repeat runs."""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--count", type=int, default=300_000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    corpora = {
+        "mixed": generate_corpus(args.count),
+        "ascii": [
+            f"https://cdn{i % 16}.example.com/catalogue/{i}/image-{i}.jpg"
+            for i in range(args.count)
+        ],
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for corpus_name, urls in corpora.items():
+            path = Path(directory) / f"{corpus_name}.txt"
+            path.write_text("\n".join(urls) + "\n", "utf-8")
+            size = path.stat().st_size / 2**20
+            print(f"{corpus_name}: {args.count:,} urls, {size:.1f} MiB")
+            results = {}
+            for name, func in (
+                ("read text", read_text),
+                ("read mmap", read_mmap),
+                ("sign text", sign_text),
+                ("sign mmap", sign_mmap),
+            ):
+                elapsed, results[name] = best_of(func, path, args.repeat)
+                per_url = elapsed / args.count * 1e6
+                print(f"  {name:<10} {elapsed:8.3f} s {per_url:8.2f} us/url")
+            if results["read text"] != results["read mmap"]:
+                sys.exit(f"{corpus_name}: read line counts differ")
+            if results["sign text"] != results["sign mmap"]:
+                sys.exit(f"{corpus_name}: sign outputs differ")
+
+
+if __name__ == "__main__":
+    main()
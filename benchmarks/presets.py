@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+"""Measures per-url cost of preset generation against per-call options.
+
+Signs the same synthetic urls with ThumborUrlGenerator.generate (options
+passed per call) and generate_preset (option path compiled once), on both
+engines, and prints us/url for each.
+"""
+import logging
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from thumbor_url_generator import ThumborUrlGenerator  # noqa: E402
+from thumbor_url_generator.presets import Preset  # noqa: E402
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--count", type=int, default=200_000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    sources = [
+        f"https://cdn{i % 16}.example.com/catalogue/{i}/image-{i}.jpg"
+        for i in range(args.count)
+    ]
+    preset = Preset("thumb", 200, 200, smart=True)
+    for engine in ("libthumbor", "fast"):
+        generator = ThumborUrlGenerator(
+            "https://thumbor.example.com", "bench-key", engine
+        )
+        cases = [
+            ("generate", lambda url: generator.generate(url, 200, 200, True)),
+            ("generate_preset", lambda url: generator.generate_preset(url, preset)),
+        ]
+        for name, func in cases:
+            start = time.perf_counter()
+            for url in sources:
+                func(url)
+            per_url = (time.perf_counter() - start) / args.count * 1e6
+            print(f"{engine:<11} {name:<16} {per_url:.2f} us/url")
+
+
+if __name__ == "__main__":
+    main()
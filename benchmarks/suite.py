@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+"""Benchmark suite for the per-url functions and the batch and server modes.
+
+Runs every case over a synthetic corpus (see corpus.py), prints us/url and
+urls/s, and optionally saves the results as JSON. With --compare, each case
+is checked against a previous results file and the run fails when any case
+is slower than the baseline by more than --threshold.
+
+    python benchmarks/suite.py -o bench.json
+    python benchmarks/suite.py --compare bench.json --threshold 0.15
+"""
+import asyncio
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from corpus import generate_corpus  # noqa: E402
+
+from thumbor_url_generator import (  # noqa: E402
+    ThumborUrlGenerator,
+    encode_url,
+    generate_safe_url,
+    generate_unsafe_url,
+)
+from thumbor_url_generator.batch import generate_batch  # noqa: E402
+from thumbor_url_generator.encoding import UrlEncoder  # noqa: E402
+from thumbor_url_generator.http_server import (  # noqa: E402
+    HttpSigningServer,
+    serve_http,
+)
+from thumbor_url_generator.presets import Preset  # noqa: E402
+from thumbor_url_generator.server import SigningServer, request_urls  # noqa: E402
+
+BASE_URL = "https://thumbor.example.com"
+KEY = "bench-key"
+OLD_KEY = "old-bench-key"
+DEFAULTS = (300, 200, True, False, None)
+SRCSET_WIDTHS = [320, 480, 640, 960, 1280, 1920]
+
+
+def time_per_url(func: Callable[[List[str]], None], urls: List[str], repeat: int):
+    """Returns the best time per url in microseconds over repeat runs."""
+    best = min(timed(func, urls) for _ in range(repeat))
+    return best / len(urls) * 1e6
+
+
+def timed(func: Callable[[List[str]], None], urls: List[str]) -> float:
+    start = time.perf_counter()
+    func(urls)
+    return time.perf_counter() - start
+
+
+def per_url_cases() -> Dict[str, Callable[[List[str]], None]]:
+    """Returns the single-process cases, each signing a whole url list."""
+    encoder = UrlEncoder()
+    libthumbor = ThumborUrlGenerator(BASE_URL, KEY, "libthumbor")
+    fast = ThumborUrlGenerator(BASE_URL, KEY, "fast")
+    preset = Preset("thumb", 300, 200, smart=True)
+    old = ThumborUrlGenerator(BASE_URL, OLD_KEY, "fast")
+    rotating = ThumborUrlGenerator(BASE_URL, KEY, thumbor_keys=[KEY, OLD_KEY])
+    return {
+        "encode_url": lambda urls: [encode_url(url) for url in urls],
+        "quote_url": lambda urls: [encoder(url) for url in urls],
+        "generate_unsafe_url": lambda urls: [
+            generate_unsafe_url(BASE_URL, url, 300, 200) for url in urls
+        ],
+        "generate_safe_url": lambda urls: [
+            generate_safe_url(BASE_URL, KEY, url, 300, 200) for url in urls
+        ],
+        "generator[libthumbor]": lambda urls: [
+            libthumbor.generate(url, 300, 200) for url in urls
+        ],
+        "generator[fast]": lambda urls: [fast.generate(url, 300, 200) for url in urls],
+        "generate_preset": lambda urls: [
+            fast.generate_preset(url, preset) for url in urls
+        ],
+        "srcset[6 widths]": lambda urls: [
+            fast.srcset(url, SRCSET_WIDTHS) for url in urls
+        ],
+        "two keys[separate]": lambda urls: [
+            (fast.generate(url, 300, 200), old.generate(url, 300, 200))
+            for url in urls
+        ],
+        "two keys[generate_all]": lambda urls: [
+            rotating.generate_all(url, 300, 200) for url in urls
+        ],
+    }
+
+
+def batch_case(jobs: int) -> Callable[[List[str]], None]:
+    def run(urls: List[str]) -> None:
+        with open(os.devnull, "w") as out_file:
+            generate_batch(
+                ({"url": url} for url in urls),
+                out_file,
+                BASE_URL,
+                KEY,
+                *DEFAULTS[:4],
+                jobs=jobs,
+            )
+
+    return run
+
+
+def unix_socket_case(directory: str) -> Callable[[List[str]], None]:
+    """Starts the socket daemon in a thread and returns a client round trip."""
+    path = os.path.join(directory, "bench.sock")
+    server = SigningServer(path, ThumborUrlGenerator(BASE_URL, KEY), DEFAULTS)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return lambda urls: list(request_urls(path, ({"url": url} for url in urls)))
+
+
+def http_case() -> Callable[[List[str]], None]:
+    """Starts the HTTP endpoint in a thread and returns single-url requests."""
+    import http.client
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = HttpSigningServer(ThumborUrlGenerator(BASE_URL, KEY), DEFAULTS)
+    threading.Thread(
+        target=asyncio.run, args=(serve_http("127.0.0.1", port, server),), daemon=True
+    ).start()
+    time.sleep(0.3)
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+
+    def run(urls: List[str]) -> None:
+        for url in urls:
+            connection.request("POST", "/sign", json.dumps([{"url": url}]))
+            connection.getresponse().read()
+
+    return run
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """Returns a message for every case slower than baseline by > threshold."""
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        ratio = result["us_per_url"] / old["us_per_url"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{name}: {old['us_per_url']:.2f} -> {result['us_per_url']:.2f} "
+                f"us/url (x{ratio:.2f})"
+            )
+    return regressions
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--count", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("-k", "--only", default=None, help="Run cases containing this")
+    parser.add_argument("-o", "--output", default=None, help="Save results as JSON")
+    parser.add_argument("--compare", default=None, help="Baseline results JSON")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Allowed slowdown against --compare, default is 0.10 (10%%)",
+    )
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    urls = generate_corpus(args.count, args.seed)
+    # The server cases make one round trip per url, run them on a slice.
+    server_urls = urls[: max(1, args.count // 10)]
+    with tempfile.TemporaryDirectory() as directory:
+        cases = [(name, case, urls) for name, case in per_url_cases().items()]
+        cases.append(("batch[jobs=1]", batch_case(1), urls))
+        if args.jobs > 1:
+            cases.append((f"batch[jobs={args.jobs}]", batch_case(args.jobs), urls))
+        cases += [
+            ("unix_socket", unix_socket_case(directory), server_urls),
+            ("http_single_url", http_case(), server_urls),
+        ]
+        results = {}
+        for name, case, case_urls in cases:
+            if args.only is not None and args.only not in name:
+                continue
+            us_per_url = time_per_url(case, case_urls, args.repeat)
+            results[name] = {
+                "us_per_url": round(us_per_url, 4),
+                "urls_per_s": round(1e6 / us_per_url),
+                "urls": len(case_urls),
+            }
+            print(f"{name:<24} {us_per_url:>9.2f} us/url {1e6 / us_per_url:>12,.0f}/s")
+
+    report = {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "count": args.count,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.output is not None:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    if args.compare is not None:
+        baseline = json.loads(Path(args.compare).read_text())["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for message in regressions:
+            print("REGRESSION", message)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""Shared fixtures; puts the repository root on sys.path like the benchmarks."""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+BASE_URL = "https://img.example.com"
+KEY = "secret"
+
+
+@pytest.fixture
+def url_file(tmp_path):
+    """Returns a function writing lines to a file in tmp_path and returning its path."""
+
+    def write(lines, name="urls.txt", newline="\n"):
+        path = tmp_path / name
+        path.write_bytes(newline.join(lines).encode("utf-8") + newline.encode())
+        return path
+
+    return write
@@ -0,0 +1,99 @@
+import io
+from collections import Counter
+
+import pytest
+from conftest import BASE_URL, KEY
+
+from thumbor_url_generator.batch import (
+    FAILED_URL,
+    LINE_KEY,
+    REJECTED_KEY,
+    generate_batch,
+    read_batch,
+    record_error,
+)
+from thumbor_url_generator.generator import ThumborUrlGenerator
+from thumbor_url_generator.presets import Preset
+from thumbor_url_generator.stats import RunStats
+
+
+@pytest.mark.parametrize(
+    "record",
+    [
+        {"url": "a.jpg"},
+        {"url": "a.jpg", "width": 0, "height": 200, "smart": False, "unsafe": True},
+        {"url": "a.jpg", "preset": "thumb", "extra": [1]},
+    ],
+)
+def test_record_error_accepts_valid_records(record):
+    assert record_error(record) is None
+
+
+@pytest.mark.parametrize(
+    "record",
+    [
+        ["a.jpg"],
+        {"width": 1},
+        {"url": ""},
+        {"url": 123},
+        {"url": "a.jpg", "width": "99999"},
+        {"url": "a.jpg", "height": "99999/filters:blur(150)"},
+        {"url": "a.jpg", "width": -1},
+        {"url": "a.jpg", "width": True},
+        {"url": "a.jpg", "width": 1.5},
+        {"url": "a.jpg", "smart": "false"},
+        {"url": "a.jpg", "unsafe": 1},
+        {"url": "a.jpg", "preset": None},
+    ],
+)
+def test_record_error_rejects_invalid_records(record):
+    assert record_error(record) is not None
+
+
+def test_read_batch_marks_and_counts_invalid_lines():
+    errors = Counter()
+    lines = [
+        "a.jpg\n",
+        "\n",
+        '{"url": 123}\n',
+        "{not json\n",
+        '{"height": 1}\n',
+        '{"url": "b.jpg", "smart": "false"}\n',
+        '{"url": "c.jpg", "width": 10}\n',
+    ]
+    records = list(read_batch(lines, errors))
+    assert records == [
+        {"url": "a.jpg", LINE_KEY: 1},
+        *({"url": "", LINE_KEY: line, REJECTED_KEY: True} for line in range(3, 7)),
+        {"url": "c.jpg", "width": 10, LINE_KEY: 7},
+    ]
+    assert errors == {"invalid_json": 1, "missing_url": 1, "invalid_record": 2}
+
+
+@pytest.mark.parametrize("options", [{}, {"jobs": 2}, {"dedupe": True}])
+def test_generate_batch_keeps_output_aligned_after_a_failed_record(options):
+    stats = RunStats()
+    lines = ["a.jpg", '{"url": "b.jpg", "preset": "nope"}', '{"url": 5}', "c.jpg"]
+    out = io.StringIO()
+    count = generate_batch(
+        read_batch(lines, stats.errors),
+        out,
+        BASE_URL,
+        KEY,
+        300,
+        200,
+        presets={"thumb": Preset.parse("thumb", "200x200")},
+        stats=stats,
+        chunk_size=1,
+        **options,
+    )
+    generator = ThumborUrlGenerator(BASE_URL, KEY)
+    assert count == 4
+    assert out.getvalue().split("\n") == [
+        generator.generate("a.jpg", "300", "200"),
+        FAILED_URL,
+        FAILED_URL,
+        generator.generate("c.jpg", "300", "200"),
+        "",
+    ]
+    assert stats.errors == {"sign_failed": 1, "invalid_record": 1}
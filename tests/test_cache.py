@@ -0,0 +1,65 @@
+import pytest
+from conftest import BASE_URL, KEY
+
+from thumbor_url_generator.batch import make_generator
+from thumbor_url_generator.cache import TieredUrlCache, UrlCache
+from thumbor_url_generator.generator import ThumborUrlGenerator
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+    cache = UrlCache(max_entries=2)
+    cache.put("a", "url-a")
+    cache.put("b", "url-b")
+    # Reading a makes b the least recently used.
+    assert cache.get("a") == "url-a"
+    cache.put("c", "url-c")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("url-a", "url-c")
+    # Putting an existing key refreshes it without evicting.
+    cache.put("a", "url-a2")
+    cache.put("d", "url-d")
+    assert cache.get("c") is None
+    assert cache.get("a") == "url-a2"
+    assert len(cache) == 2
+    assert cache.stats() == {
+        "entries": 2,
+        "max_entries": 2,
+        "hits": 4,
+        "misses": 2,
+        "evictions": 2,
+    }
+
+
+def test_lru_needs_room_for_one_entry():
+    with pytest.raises(ValueError):
+        UrlCache(max_entries=0)
+
+
+def test_generator_cache_returns_the_uncached_url():
+    generator = ThumborUrlGenerator(BASE_URL, KEY, cache_size=1)
+    uncached = ThumborUrlGenerator(BASE_URL, KEY)
+    for _ in range(2):
+        for url in ("a.jpg", "b.jpg"):
+            assert generator.generate(url, 300, 200) == uncached.generate(
+                url, 300, 200
+            )
+    stats = generator.cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (0, 4, 3)
+
+
+def test_cache_size_puts_an_lru_in_front_of_the_disk_cache(tmp_path):
+    path = tmp_path / "urls.sqlite3"
+    generator = make_generator(BASE_URL, KEY, cache_size=10, disk_cache=path)
+    assert isinstance(generator.cache, TieredUrlCache)
+    first = generator.generate("a.jpg", 300, 200)
+    assert generator.generate("a.jpg", 300, 200) == first
+    assert generator.cache.back.hits == 0
+    generator.cache.close()
+
+    generator = make_generator(BASE_URL, KEY, cache_size=10, disk_cache=path)
+    assert generator.generate("a.jpg", 300, 200) == first
+    assert generator.generate("a.jpg", 300, 200) == first
+    stats = generator.cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 0, 1)
+    assert stats["back"]["hits"] == 1
+    generator.cache.close()
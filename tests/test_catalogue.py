@@ -0,0 +1,99 @@
+import sqlite3
+
+import pytest
+from conftest import BASE_URL, KEY
+
+from thumbor_url_generator.catalogue import Catalogue
+from thumbor_url_generator.generator import ThumborUrlGenerator
+from thumbor_url_generator.presets import Preset
+from thumbor_url_generator.stats import RunStats
+
+THUMB = Preset("thumb", 200, 200, smart=True)
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "catalogue.sqlite3"
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE images (id INTEGER PRIMARY KEY, src)")
+        connection.executemany(
+            "INSERT INTO images (src) VALUES (?)",
+            [("a.jpg",), ("b.jpg",), (None,), ("",), ("c.jpg",)],
+        )
+    connection.close()
+    return path
+
+
+def sign(path, preset=THUMB, stats=None):
+    catalogue = Catalogue(path, "images", "src", "url")
+    try:
+        return catalogue.sign(ThumborUrlGenerator(BASE_URL, KEY), preset, stats=stats)
+    finally:
+        catalogue.close()
+
+
+def signed_urls(path):
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute("SELECT src, url FROM images ORDER BY id").fetchall()
+    finally:
+        connection.close()
+
+
+def update(path, sql, *params):
+    with sqlite3.connect(path) as connection:
+        connection.execute(sql, params)
+    connection.close()
+
+
+def test_first_run_signs_every_row(database):
+    counts = sign(database)
+    assert counts == {"scanned": 5, "updated": 5}
+    generator = ThumborUrlGenerator(BASE_URL, KEY)
+    assert signed_urls(database) == [
+        ("a.jpg", generator.generate_preset("a.jpg", THUMB)),
+        ("b.jpg", generator.generate_preset("b.jpg", THUMB)),
+        (None, None),
+        ("", None),
+        ("c.jpg", generator.generate_preset("c.jpg", THUMB)),
+    ]
+
+
+def test_unchanged_rerun_updates_nothing(database):
+    sign(database)
+    assert sign(database) == {"scanned": 5, "updated": 0}
+
+
+def test_edited_source_is_signed_again(database):
+    sign(database)
+    update(database, "UPDATE images SET src = 'd.jpg' WHERE src = 'b.jpg'")
+    update(database, "UPDATE images SET src = 'e.jpg' WHERE src IS NULL")
+    assert sign(database)["updated"] == 2
+    generator = ThumborUrlGenerator(BASE_URL, KEY)
+    urls = dict(signed_urls(database))
+    assert urls["d.jpg"] == generator.generate_preset("d.jpg", THUMB)
+    assert urls["e.jpg"] == generator.generate_preset("e.jpg", THUMB)
+
+
+def test_preset_change_signs_every_row_again(database):
+    sign(database)
+    hero = Preset("hero", 1600, 0, fit_in=True)
+    assert sign(database, hero) == {"scanned": 5, "updated": 5}
+    generator = ThumborUrlGenerator(BASE_URL, KEY)
+    assert dict(signed_urls(database))["a.jpg"] == generator.generate_preset(
+        "a.jpg", hero
+    )
+
+
+def test_non_text_sources_are_counted_and_skipped(database):
+    update(database, "UPDATE images SET src = 42 WHERE src = 'b.jpg'")
+    update(database, "UPDATE images SET src = x'00ff' WHERE src = 'c.jpg'")
+    stats = RunStats()
+    assert sign(database, stats=stats) == {"scanned": 5, "updated": 3, "invalid": 2}
+    assert stats.errors == {"invalid_source": 2}
+    rows = signed_urls(database)
+    assert rows[1] == (42, None)
+    assert rows[4] == (b"\x00\xff", None)
+    # Fixing the source signs it on the next run.
+    update(database, "UPDATE images SET src = 'b.jpg' WHERE src = 42")
+    assert sign(database) == {"scanned": 5, "updated": 1, "invalid": 1}
@@ -0,0 +1,76 @@
+import io
+
+import pytest
+from conftest import BASE_URL, KEY
+
+from thumbor_url_generator.batch import generate_batch, read_batch
+from thumbor_url_generator.checkpoint import BatchCheckpoint, OffsetReader
+
+OPTIONS = {"defaults": [300, 200]}
+
+
+def sign_text(path) -> str:
+    out = io.StringIO()
+    with open(path, encoding="utf-8") as file:
+        generate_batch(read_batch(file), out, BASE_URL, KEY, 300, 200)
+    return out.getvalue()
+
+
+def sign_checkpointed(path, output, every=2, resume=False, fail_after=None) -> None:
+    checkpoint = BatchCheckpoint(output, OPTIONS, every)
+    in_file, out_file = checkpoint.open(path, resume)
+    records = read_batch(in_file)
+    if fail_after is not None:
+        records = crash_after(records, fail_after)
+    try:
+        generate_batch(
+            records, out_file, BASE_URL, KEY, 300, 200, checkpoint=checkpoint
+        )
+    finally:
+        checkpoint.close()
+
+
+def crash_after(records, count):
+    for index, record in enumerate(records):
+        if index == count:
+            raise KeyboardInterrupt
+        yield record
+
+
+def test_offset_reader_splits_like_text_mode(tmp_path):
+    path = tmp_path / "urls.txt"
+    path.write_bytes(b"a.jpg\rb.jpg\r\nc.jpg\n\r\rd.jpg\r\ne.jpg\rf.jpg")
+    with open(path, encoding="utf-8") as file:
+        expected = [line.strip() for line in file]
+    with open(path, "rb") as raw:
+        reader = OffsetReader(raw)
+        lines, offsets = [], []
+        for line in reader:
+            lines.append(line.strip())
+            offsets.append(reader.offset)
+    assert lines == expected
+    # Every offset is the start of the remaining lines.
+    for index, offset in enumerate(offsets):
+        with open(path, "rb") as raw:
+            rest = [line.strip() for line in OffsetReader(raw, offset)]
+        assert rest == expected[index + 1 :]
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n", "\r"])
+def test_checkpointed_output_matches_text_output(url_file, tmp_path, newline):
+    path = url_file([f"img/{i}.jpg" for i in range(7)], newline=newline)
+    output = tmp_path / "out.txt"
+    sign_checkpointed(path, output)
+    assert output.read_text("utf-8") == sign_text(path)
+
+
+def test_resume_after_crash_truncates_and_continues(url_file, tmp_path):
+    path = url_file([f"img/{i}.jpg" for i in range(9)], newline="\r")
+    output = tmp_path / "out.txt"
+    with pytest.raises(KeyboardInterrupt):
+        sign_checkpointed(path, output, fail_after=5)
+    # Urls written after the last checkpoint are cut and signed again.
+    with open(output, "a", encoding="utf-8") as file:
+        file.write("partial")
+    sign_checkpointed(path, output, resume=True)
+    assert output.read_text("utf-8") == sign_text(path)
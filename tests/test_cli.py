@@ -0,0 +1,99 @@
+import sys
+from contextlib import nullcontext
+
+import pytest
+
+from thumbor_url_generator.cli import parse_args
+
+
+def parse(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["thumbor-url-generator", *argv])
+    return parse_args()
+
+
+def test_disk_cache_path_is_only_resolved_when_used(monkeypatch, tmp_path):
+    monkeypatch.delenv("HOME", raising=False)
+    monkeypatch.delenv("XDG_CACHE_HOME", raising=False)
+    assert parse(monkeypatch, "-W", "300", "a.jpg").disk_cache is None
+    with pytest.raises(SystemExit):
+        parse(monkeypatch, "-i", "urls.txt", "--disk-cache")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    args = parse(monkeypatch, "-i", "urls.txt", "--disk-cache")
+    assert args.disk_cache == str(tmp_path / "thumbor-url-generator/urls.sqlite3")
+
+
+@pytest.mark.parametrize("every", ["0", "-5"])
+def test_checkpoint_every_must_be_positive(monkeypatch, every):
+    with pytest.raises(SystemExit):
+        parse(monkeypatch, "-i", "urls.txt", "-o", "out", "--checkpoint-every", every)
+
+
+def test_connect_sends_explicit_flags_under_the_records_own_keys(monkeypatch):
+    from thumbor_url_generator.batch import LINE_KEY
+    from thumbor_url_generator.cli import client_options, client_record
+
+    args = parse(monkeypatch, "--connect", "sock", "-W", "800", "-u", "a.jpg")
+    options = client_options(args)
+    assert options == {"width": 800, "unsafe": True}
+    record = {"url": "b.jpg", "width": 5, LINE_KEY: 3}
+    assert client_record(options, record) == {
+        "url": "b.jpg",
+        "width": 5,
+        "unsafe": True,
+    }
+
+
+@pytest.mark.parametrize(
+    "mode",
+    [
+        ["--transform", "image", "--add-column", "thumb"],
+        ["--verify"],
+        ["-W", "300"],
+        ["-W", "300", "--checkpoint-every", "1"],
+    ],
+)
+def test_output_file_gets_what_stdout_would(monkeypatch, tmp_path, capsys, mode):
+    from thumbor_url_generator.cli import main
+
+    # Set here rather than in the config, which load_dotenv leaves in os.environ.
+    monkeypatch.setenv("THUMBOR_BASE_URL", "https://img.example.com")
+    monkeypatch.setenv("THUMBOR_KEY", "secret")
+    monkeypatch.setenv("PRESETS", "thumb=100x100 smart")
+    config = tmp_path / "config"
+    config.write_text("")
+    feed = tmp_path / "feed.jsonl"
+    feed.write_text('{"image": "a.jpg"}\n{"image": "b.jpg"}\nnot json\n')
+    argv = ["-e", str(config), *mode, "-i", str(feed)]
+    monkeypatch.setattr(sys, "argv", ["thumbor-url-generator", *argv])
+    with pytest.raises(SystemExit) if "--verify" in mode else nullcontext():
+        main()
+    stdout = capsys.readouterr().out
+    assert stdout
+    output = tmp_path / "out"
+    argv += ["-o", str(output)]
+    monkeypatch.setattr(sys, "argv", ["thumbor-url-generator", *argv])
+    with pytest.raises(SystemExit) if "--verify" in mode else nullcontext():
+        main()
+    assert capsys.readouterr().out == ""
+    assert output.read_text("utf-8") == stdout
+
+
+@pytest.mark.parametrize("mode", [[], ["-j", "2"], ["--dedupe"], ["--mmap"]])
+def test_batch_output_stays_aligned_and_failures_are_reported(
+    monkeypatch, tmp_path, capsysbinary, mode
+):
+    from thumbor_url_generator.cli import main
+
+    monkeypatch.setenv("THUMBOR_BASE_URL", "https://img.example.com")
+    monkeypatch.setenv("THUMBOR_KEY", "secret")
+    config = tmp_path / "config"
+    config.write_text("")
+    feed = tmp_path / "urls.txt"
+    feed.write_text('a.jpg\n{"url": 5}\n{"url": "b.jpg", "preset": "nope"}\nc.jpg\n')
+    argv = ["-e", str(config), "-W", "300", "-H", "200", "-i", str(feed), *mode]
+    monkeypatch.setattr(sys, "argv", ["thumbor-url-generator", *argv])
+    main()
+    out, err = capsysbinary.readouterr()
+    lines = out.decode().split("\n")
+    assert len(lines) == 5 and lines[1:3] == ["", ""]
+    assert b"Failed records: 2 (invalid_record=1, sign_failed=1)" in err
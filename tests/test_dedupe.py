@@ -0,0 +1,58 @@
+import io
+
+import pytest
+from conftest import BASE_URL, KEY
+
+from thumbor_url_generator.batch import generate_batch, read_batch
+from thumbor_url_generator.presets import Preset
+from thumbor_url_generator.stats import RunStats
+
+PRESETS = {"thumb": Preset.parse("thumb", "200x200 smart")}
+LINES = [
+    "a.jpg",
+    "b.jpg",
+    "a.jpg",
+    '{"url": "a.jpg", "width": 50}',
+    '{"url": "a.jpg", "preset": "thumb"}',
+    '{"url": "b.jpg", "preset": "thumb"}',
+    '{"url": "b.jpg", "preset": "thumb", "unsafe": true}',
+    '{"url": "a.jpg", "preset": "thumb"}',
+    "a.jpg",
+]
+# Distinct (url, options) pairs of LINES.
+DISTINCT = 6
+
+
+def sign(lines, **options) -> str:
+    out = io.StringIO()
+    generate_batch(
+        read_batch(lines), out, BASE_URL, KEY, 300, 200, presets=PRESETS, **options
+    )
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("all_keys", [False, True])
+def test_dedupe_output_matches_plain_output(all_keys):
+    options = {"all_keys": all_keys, "thumbor_keys": [KEY, "old"] if all_keys else None}
+    assert sign(LINES, dedupe=True, **options) == sign(LINES, **options)
+
+
+def test_dedupe_signs_misses_through_the_generator_cache():
+    stats = RunStats()
+    output = sign(LINES, dedupe=True, cache_size=100, stats=stats)
+    assert output == sign(LINES)
+    cache = stats.cache.stats()
+    # Only the first occurrence of each distinct record reaches the cache.
+    assert cache["hits"] + cache["misses"] == DISTINCT
+    assert stats.dedupe == {"signed": DISTINCT, "reused": len(LINES) - DISTINCT}
+
+
+def test_dedupe_counts_are_summed_over_workers():
+    stats = RunStats()
+    output = sign(LINES * 4, dedupe=True, jobs=2, chunk_size=len(LINES), stats=stats)
+    assert output == sign(LINES * 4)
+    assert sum(stats.dedupe.values()) == len(LINES) * 4
+    assert DISTINCT <= stats.dedupe["signed"] <= 2 * DISTINCT
+    report = io.StringIO()
+    stats.report(report)
+    assert "dedupe: " in report.getvalue()
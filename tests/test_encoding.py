@@ -0,0 +1,57 @@
+import random
+from urllib.parse import quote
+
+import pytest
+
+from thumbor_url_generator.encoding import BytesUrlEncoder, UrlEncoder, quote_url
+
+ALPHABET = "ab/:?&=%#~._- +Zé画🙂\x00\x7f "
+
+
+def reference(url) -> str:
+    return quote(url).replace("/", "%2F")
+
+
+def random_urls(count: int):
+    rng = random.Random(1)
+    for _ in range(count):
+        host = "".join(rng.choices("abc.", k=rng.randint(0, 6)))
+        path = "".join(rng.choices(ALPHABET, k=rng.randint(0, 20)))
+        yield rng.choice(["https://", "http://", "s3://", "", "//"]) + host + path
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "",
+        "https://example.com/image.jpg",
+        "https://例え.jp/画像/写真 1.jpeg?q=a&b=c#frag",
+        "s3://bucket/key with spaces/~tilde.webp",
+        "https://",
+        "no-scheme/path",
+        "".join(map(chr, range(256))),
+    ],
+)
+def test_quote_url_matches_urllib(url):
+    assert quote_url(url) == reference(url)
+
+
+def test_encoders_match_urllib_on_a_random_corpus():
+    encoder = UrlEncoder(max_prefixes=8)
+    bytes_encoder = BytesUrlEncoder(max_prefixes=8)
+    for url in random_urls(5000):
+        expected = reference(url)
+        assert encoder(url) == expected, url
+        assert bytes_encoder(url.encode("utf-8")) == expected.encode("ascii"), url
+
+
+def test_bytes_encoder_encodes_every_byte_value():
+    data = bytes(range(256))
+    assert BytesUrlEncoder()(data) == quote(data).replace("/", "%2F").encode()
+
+
+def test_prefix_memo_is_bounded():
+    encoder = UrlEncoder(max_prefixes=4)
+    for index in range(10):
+        encoder(f"https://cdn{index}.example.com/a.jpg")
+    assert len(encoder.prefixes) <= 4
@@ -0,0 +1,42 @@
+import asyncio
+from http import HTTPStatus
+
+from conftest import BASE_URL, KEY
+
+from thumbor_url_generator.batch import make_generator
+from thumbor_url_generator.http_server import HttpSigningServer
+
+DEFAULTS = (300, 200, True, False, None)
+
+
+def sign(body: bytes):
+    server = HttpSigningServer(make_generator(BASE_URL, KEY), DEFAULTS)
+    return asyncio.run(server.route("POST", "/sign", body))
+
+
+def test_sign_answers_each_record_in_order():
+    generator = make_generator(BASE_URL, KEY)
+    status, payload = sign(b'[{"url": "a.jpg", "width": 10}, {"width": 1}]')
+    assert status == HTTPStatus.OK
+    assert payload == [
+        {"url": generator.generate("a.jpg", "10", "200", True)},
+        {"error": "record has no url"},
+    ]
+
+
+def test_sign_rejects_option_injection():
+    _, payload = sign(
+        b'[{"url": "a.jpg", "width": "99999", "height": "99999/filters:blur(150)"},'
+        b' {"url": "a.jpg", "smart": "false"}]'
+    )
+    assert all(set(result) == {"error"} for result in payload)
+
+
+def test_sign_answers_large_batches_in_order():
+    generator = make_generator(BASE_URL, KEY)
+    urls = [f"{index}.jpg" for index in range(1000)]
+    body = "[%s]" % ", ".join(f'{{"url": "{url}"}}' for url in urls)
+    _, payload = sign(body.encode("utf-8"))
+    assert payload == [
+        {"url": generator.generate(url, "300", "200", True)} for url in urls
+    ]
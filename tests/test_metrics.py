@@ -0,0 +1,110 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+import urllib.request
+
+from conftest import BASE_URL, KEY
+
+from thumbor_url_generator.batch import make_generator
+from thumbor_url_generator.http_server import HttpSigningServer
+from thumbor_url_generator.metrics import (
+    PREFIX,
+    Histogram,
+    ServerMetrics,
+    serve_metrics,
+)
+from thumbor_url_generator.server import SigningServer, request_urls
+
+DEFAULTS = (300, 200, True, False, None)
+
+
+def sample(text: str, name: str) -> str:
+    """Returns the value of the sample line starting with name."""
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return line.split(" ", 1)[1]
+    raise KeyError(name)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram((1, 5, 10))
+    for value in (0.5, 1, 3, 7, 7, 20):
+        histogram.observe(value)
+    text = "\n".join(histogram.render("size", "Sizes."))
+    assert text.splitlines()[:2] == ["# HELP size Sizes.", "# TYPE size histogram"]
+    assert sample(text, 'size_bucket{le="1"}') == "2"
+    assert sample(text, 'size_bucket{le="5"}') == "3"
+    assert sample(text, 'size_bucket{le="10"}') == "5"
+    assert sample(text, 'size_bucket{le="+Inf"}') == "6"
+    assert sample(text, "size_sum") == "38.5"
+    assert sample(text, "size_count") == "6"
+
+
+def test_server_metrics_render_counts_and_cache():
+    generator = make_generator(BASE_URL, KEY, cache_size=10)
+    metrics = ServerMetrics(generator.cache)
+    metrics.timed_sign("safe", lambda: generator.generate("a.jpg", "1", "1"))
+    metrics.timed_sign("unsafe", lambda: "url")
+    metrics.in_flight = 2
+    text = metrics.render()
+    assert sample(text, f'{PREFIX}_requests_total{{mode="safe"}}') == "1"
+    assert sample(text, f'{PREFIX}_requests_total{{mode="unsafe"}}') == "1"
+    assert sample(text, f"{PREFIX}_errors_total") == "0"
+    assert sample(text, f"{PREFIX}_in_flight_requests") == "2"
+    assert sample(text, f"{PREFIX}_sign_duration_seconds_count") == "2"
+    assert sample(text, f"{PREFIX}_cache_misses_total") == "1"
+    assert text.endswith("\n")
+
+
+def test_http_sign_counts_every_rejected_record():
+    server = HttpSigningServer(make_generator(BASE_URL, KEY), DEFAULTS)
+    body = b'[{"url": "a.jpg"}, {"width": 1}, {"url": "b.jpg", "smart": "no"},'
+    body += b' {"url": "c.jpg", "preset": "nope"}]'
+    asyncio.run(server.route("POST", "/sign", body))
+    status, text = asyncio.run(server.route("GET", "/metrics", b""))
+    assert status == 200
+    assert sample(text, f"{PREFIX}_errors_total") == "3"
+    assert sample(text, f'{PREFIX}_requests_total{{mode="safe"}}') == "1"
+    assert sample(text, f"{PREFIX}_batch_size_sum") == "4"
+
+
+def test_daemon_counts_rejected_records_and_requests(tmp_path):
+    path = tmp_path / "sign.sock"
+    server = SigningServer(path, make_generator(BASE_URL, KEY), DEFAULTS)
+    threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True).start()
+    try:
+        records = [{"url": "a.jpg"}, {"width": 1}, {"url": "b.jpg", "smart": "no"}]
+        list(request_urls(path, records))
+        # A connection left open without a pending request is not in flight.
+        with socket.socket(socket.AF_UNIX) as client:
+            client.connect(str(path))
+            client.sendall(json.dumps({"url": "c.jpg"}).encode("utf-8") + b"\n")
+            client.makefile("rb").readline()
+            deadline = time.monotonic() + 5
+            while server.metrics.in_flight and time.monotonic() < deadline:
+                time.sleep(0.01)
+            in_flight = server.metrics.in_flight
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert in_flight == 0
+    assert server.metrics.errors == 2
+    assert server.metrics.requests["safe"] == 2
+
+
+def test_serve_metrics_answers_get_metrics():
+    metrics = ServerMetrics()
+    metrics.errors = 4
+    server = serve_metrics("127.0.0.1:0", metrics)
+    try:
+        url = "http://127.0.0.1:%d/metrics" % server.server_address[1]
+        with urllib.request.urlopen(url, timeout=5) as response:
+            content_type = response.headers["Content-Type"]
+            text = response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert content_type.startswith("text/plain; version=0.0.4")
+    assert sample(text, f"{PREFIX}_errors_total") == "4"
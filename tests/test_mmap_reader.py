@@ -0,0 +1,79 @@
+import io
+from collections import Counter
+
+import pytest
+from conftest import BASE_URL, KEY
+
+from thumbor_url_generator.batch import generate_batch, make_generator, read_batch
+from thumbor_url_generator import mmap_reader
+from thumbor_url_generator.mmap_reader import generate_batch_mmap, iter_lines
+from thumbor_url_generator.presets import Preset
+from thumbor_url_generator.stats import RunStats
+
+PRESETS = {"thumb": Preset.parse("thumb", "200x200 smart")}
+DEFAULTS = (300, 200, True, False, None)
+
+
+def sign_text(path, stats: RunStats) -> bytes:
+    out = io.StringIO()
+    with open(path, encoding="utf-8") as file:
+        records = read_batch(file, stats.errors)
+        generate_batch(
+            records, out, BASE_URL, KEY, *DEFAULTS[:4], presets=PRESETS, stats=stats
+        )
+    return out.getvalue().encode("utf-8")
+
+
+def sign_mmap(path, errors: Counter) -> bytes:
+    out = io.BytesIO()
+    generator = make_generator(BASE_URL, KEY, presets=PRESETS)
+    preset = Preset("300x200", "300", "200", True)
+    generate_batch_mmap(path, out, generator, preset, DEFAULTS, errors)
+    return out.getvalue()
+
+
+def assert_same_output(path):
+    stats, errors = RunStats(), Counter()
+    assert sign_mmap(path, errors) == sign_text(path, stats)
+    assert errors == stats.errors
+
+
+def test_json_records_are_validated_and_signed_like_read_batch(url_file):
+    assert_same_output(
+        url_file(
+            [
+                "a.jpg",
+                '{"url": "b.jpg", "width": 50, "smart": false}',
+                '{"url": "c.jpg", "preset": "thumb", "unsafe": true}',
+                '{"url": "d.jpg", "width": "50"}',
+                '{"url": "e.jpg", "preset": "nope"}',
+                '{"width": 50}',
+                "{not json",
+                '["f.jpg"]',
+                "g.jpg",
+            ]
+        )
+    )
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 7, 1 << 20])
+def test_lines_are_split_and_stripped_like_text_mode(
+    tmp_path, monkeypatch, block_size
+):
+    monkeypatch.setattr(mmap_reader, "BLOCK_SIZE", block_size)
+    path = tmp_path / "urls.txt"
+    path.write_bytes(
+        "a.jpg\rb.jpg\r\n\r\nc.jpg\n\r"
+        " d.jpg \r"
+        "\x1ce.jpg\x1f\n"
+        " \n"
+        '  {"url": "f.jpg", "width": 10} \r'
+        "café.jpg\r\n"
+        "\u2003h.jpg\u00a0\n"
+        '{"url": 5}\rg.jpg'.encode("utf-8")
+    )
+    with open(path, encoding="utf-8") as file:
+        assert list(iter_lines(path)) == [
+            line.strip().encode("utf-8") for line in file
+        ]
+    assert_same_output(path)
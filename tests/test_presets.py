@@ -0,0 +1,37 @@
+import pytest
+
+from thumbor_url_generator.presets import Preset, parse_presets
+
+
+@pytest.mark.parametrize(
+    "spec, size, smart, fit_in, path",
+    [
+        ("200x200 smart", (200, 200), True, False, "200x200/smart/"),
+        ("1600x0 fit-in", (1600, 0), False, True, "fit-in/1600x0/"),
+        ("x300", (0, 300), False, False, "0x300/"),
+        ("smart  300x", (300, 0), True, False, "300x0/smart/"),
+    ],
+)
+def test_parse_spec(spec, size, smart, fit_in, path):
+    preset = Preset.parse("name", spec)
+    assert (preset.width, preset.height) == size
+    assert (preset.smart, preset.fit_in, preset.path) == (smart, fit_in, path)
+
+
+@pytest.mark.parametrize("spec", ["200x200 blur", "200 x 200", "fit-in", "-1x2"])
+def test_parse_rejects_bad_specs(spec):
+    with pytest.raises(ValueError):
+        Preset.parse("name", spec)
+
+
+def test_parse_presets():
+    presets = parse_presets("thumb=200x200 smart, hero = 1600x0 fit-in,")
+    assert list(presets) == ["thumb", "hero"]
+    assert presets["hero"].name == "hero"
+    assert presets["hero"].path == "fit-in/1600x0/"
+
+
+@pytest.mark.parametrize("text", ["thumb", "=200x200", "thumb=200x200,hero"])
+def test_parse_presets_needs_name_equals_spec(text):
+    with pytest.raises(ValueError, match="Invalid preset entry"):
+        parse_presets(text)
@@ -0,0 +1,110 @@
+import io
+import logging
+import sys
+
+from conftest import BASE_URL, KEY
+from libthumbor import CryptoURL
+
+from thumbor_url_generator import cli, generator
+from thumbor_url_generator.profiling import StageTimer
+from thumbor_url_generator.signer import FastCryptoURL, KeyRing
+
+
+def patched_attributes():
+    """Returns the attributes instrument() patches, by owner and name."""
+    owners = [
+        (generator, "quote_url"),
+        (CryptoURL, "generate"),
+        (FastCryptoURL, "sign"),
+        (KeyRing, "sign_all"),
+        (generator, "copy"),
+        (cli, "copy"),
+    ]
+    owners += [(handler, "handle") for handler in logging.getLogger().handlers]
+    return {(id(owner), attr): getattr(owner, attr) for owner, attr in owners}
+
+
+def test_profile_restores_every_patched_attribute(monkeypatch, tmp_path, capsys):
+    monkeypatch.setenv("THUMBOR_BASE_URL", BASE_URL)
+    monkeypatch.setenv("THUMBOR_KEY", KEY)
+    config = tmp_path / "config"
+    config.write_text("")
+    urls = tmp_path / "urls.txt"
+    urls.write_text("a.jpg\nb.jpg\n")
+    before = patched_attributes()
+    # Keep the handler main() installs, so its patch is checked too.
+    argv = ["-e", str(config), "-W", "300", "-H", "200", "-i", str(urls), "--profile"]
+    monkeypatch.setattr(sys, "argv", ["thumbor-url-generator", *argv])
+    cli.main()
+    after = patched_attributes()
+    assert {key: after[key] for key in before} == before
+    assert CryptoURL.__dict__["generate"] is before[id(CryptoURL), "generate"]
+    assert "encode" in capsys.readouterr().err
+
+
+def test_patch_times_calls_and_restore_undoes_it():
+    class Owner:
+        @staticmethod
+        def work(value):
+            return value * 2
+
+    original = Owner.work
+    timer = StageTimer()
+    timer.patch(Owner, "work", "work")
+    assert Owner.work is not original
+    assert [Owner.work(value) for value in range(3)] == [0, 2, 4]
+    assert timer.calls["work"] == 3
+    timer.restore()
+    assert Owner.work is original
+    assert timer.patched == []
+
+
+def test_iterate_and_writer_time_each_step():
+    timer = StageTimer()
+    out = io.StringIO()
+    writer = timer.writer("write", out)
+    for item in timer.iterate("read", ["a", "b", "c"]):
+        writer.write(item)
+    writer.flush()
+    assert out.getvalue() == "abc"
+    # The exhausting step is timed too.
+    assert (timer.calls["read"], timer.calls["write"]) == (4, 3)
+
+
+def test_sampled_timer_only_times_every_nth_call():
+    timer = StageTimer(sample_every=4)
+    assert list(timer.iterate("read", range(10))) == list(range(10))
+    work = timer.wrap("work", lambda: None)
+    for _ in range(9):
+        work()
+    assert timer.histograms["read"].count == 2
+    assert timer.histograms["work"].count == 3
+
+
+def test_disabled_timer_returns_its_input():
+    timer = StageTimer(enabled=False)
+    items, out = [1, 2], io.StringIO()
+    assert timer.iterate("read", items) is items
+    assert timer.writer("write", out) is out
+    timer.patch(generator, "quote_url", "encode")
+    assert timer.patched == []
+
+
+def test_report_rows_add_up_to_the_total():
+    timer = StageTimer()
+    timer.outer.add("url")
+    timer.add("url", 0.5, 0.4)
+    timer.add("encode", 0.1, 0.1)
+    timer.add("sign", 0.2, 0.2)
+    timer.add("sign", 0.1, 0.1)
+    out = io.StringIO()
+    timer.report(out)
+    rows = {line.split()[0]: line.split() for line in out.getvalue().splitlines()[1:]}
+    assert rows["sign"][1:3] == ["2", "0.3000"]
+    wall = {
+        stage: float(row[1] if stage in ("other", "total") else row[2])
+        for stage, row in rows.items()
+    }
+    inner = wall["encode"] + wall["sign"] + wall["other"]
+    assert abs(inner - wall["total"]) < 1e-3
+    assert list(rows) == ["url", "sign", "encode", "other", "total"]
@@ -0,0 +1,76 @@
+import threading
+from collections import Counter
+
+import pytest
+from conftest import BASE_URL, KEY
+
+from thumbor_url_generator.batch import FAILED_URL, REJECTED_KEY, make_generator
+from thumbor_url_generator.server import SigningServer, request_urls
+
+DEFAULTS = (300, 200, True, False, None)
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    path = tmp_path / "sign.sock"
+    server = SigningServer(path, make_generator(BASE_URL, KEY), DEFAULTS)
+    threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True).start()
+    yield path
+    server.shutdown()
+    server.server_close()
+
+
+def test_daemon_signs_records(daemon):
+    generator = make_generator(BASE_URL, KEY)
+    assert list(request_urls(daemon, [{"url": "a.jpg", "width": 10}])) == [
+        generator.generate("a.jpg", "10", "200", True)
+    ]
+
+
+@pytest.mark.parametrize(
+    "record",
+    [
+        {"url": "a.jpg", "width": "99999", "height": "1/filters:blur(150)"},
+        {"url": "a.jpg", "smart": "false"},
+        {"width": 10},
+    ],
+)
+def test_daemon_rejects_invalid_records(daemon, record):
+    errors = Counter()
+    assert list(request_urls(daemon, [record], errors)) == [FAILED_URL]
+    assert errors == {"request_failed": 1}
+
+
+def test_client_keeps_going_after_a_failed_record(daemon):
+    generator = make_generator(BASE_URL, KEY)
+    records = [
+        {"url": "a.jpg"},
+        {"url": "b.jpg", "preset": "nope"},
+        {"url": "", REJECTED_KEY: True},
+        {"url": "c.jpg"},
+    ]
+    errors = Counter()
+    assert list(request_urls(daemon, records, errors)) == [
+        generator.generate("a.jpg", "300", "200"),
+        FAILED_URL,
+        FAILED_URL,
+        generator.generate("c.jpg", "300", "200"),
+    ]
+    # The rejected record was counted when read, and is not sent.
+    assert errors == {"request_failed": 1}
+
+
+def test_daemon_uses_the_disk_cache_from_handler_threads(tmp_path):
+    cache_path = tmp_path / "urls.sqlite3"
+    generator = make_generator(BASE_URL, KEY, disk_cache=cache_path)
+    server = SigningServer(tmp_path / "sign.sock", generator, DEFAULTS)
+    threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True).start()
+    try:
+        urls = list(request_urls(tmp_path / "sign.sock", [{"url": "a.jpg"}]))
+    finally:
+        server.shutdown()
+        server.server_close()
+    generator.cache.close()
+    cache = make_generator(BASE_URL, KEY, disk_cache=cache_path).cache
+    assert cache.get(("a.jpg", 300, 200, True, False)) == urls[0]
+    cache.close()
@@ -0,0 +1,50 @@
+import io
+
+import pytest
+
+from thumbor_url_generator.shard import INDEX_KEY, ShardSelector, merge_shards, shard_of
+
+
+def shard_files(urls, count):
+    """Returns the <index>\\t<url> output of each shard of urls."""
+    files = []
+    for shard in range(count):
+        records = ({"url": url} for url in urls)
+        lines = (
+            f"{record[INDEX_KEY]}\t{record['url']}\n"
+            for record in ShardSelector(shard, count).select(records)
+        )
+        files.append("".join(lines))
+    return files
+
+
+def merge(files) -> str:
+    out = io.StringIO()
+    merge_shards([io.StringIO(text) for text in files], out)
+    return out.getvalue()
+
+
+def test_every_record_lands_on_its_shard_once():
+    urls = [f"img/{i}.jpg" for i in range(50)] + ["img/1.jpg"]
+    files = shard_files(urls, 3)
+    for shard, text in enumerate(files):
+        for line in text.splitlines():
+            assert shard_of(line.partition("\t")[2], 3) == shard
+    assert sum(text.count("\n") for text in files) == len(urls)
+
+
+def test_merge_restores_input_order():
+    urls = [f"img/{i}.jpg" for i in range(50)]
+    assert merge(shard_files(urls, 3)) == "".join(f"{url}\n" for url in urls)
+
+
+def test_merge_raises_on_a_missing_shard():
+    files = shard_files([f"img/{i}.jpg" for i in range(50)], 3)
+    with pytest.raises(Exception, match="missing or incomplete"):
+        merge([files[0], files[2]])
+
+
+def test_merge_raises_on_a_repeated_record():
+    files = shard_files([f"img/{i}.jpg" for i in range(50)], 3)
+    with pytest.raises(Exception, match="missing or incomplete"):
+        merge([*files, files[1]])
@@ -0,0 +1,68 @@
+from itertools import product
+
+import pytest
+from libthumbor import CryptoURL
+
+from thumbor_url_generator.encoding import quote_url
+from thumbor_url_generator.generator import ThumborUrlGenerator
+from thumbor_url_generator.presets import Preset
+from thumbor_url_generator.signer import FastCryptoURL, KeyRing
+
+KEYS = ["secret", "clé-üñï", "k" * 200]
+SIZES = [0, 1, 200, 1600, "0", "300", ""]
+SOURCES = [
+    "https://example.com/image.jpg",
+    "http://cdn.example.com/a/b/c.png?size=large&v=2#frag",
+    "https://例え.jp/画像/写真 1.jpeg",
+    "s3://bucket/key with spaces/~tilde.webp",
+    "https://example.com/" + "x" * 2000,
+]
+
+
+def generate_or_error(crypto, options: dict) -> str:
+    try:
+        return crypto.generate(**options)
+    except ValueError as err:
+        return f"ValueError: {err}"
+
+
+@pytest.mark.parametrize("key", KEYS)
+def test_fast_signer_matches_libthumbor(key):
+    reference, fast = CryptoURL(key=key), FastCryptoURL(key=key)
+    for width, height, smart, fit_in, source in product(
+        SIZES, SIZES, (True, False), (True, False), SOURCES
+    ):
+        options = dict(
+            width=width,
+            height=height,
+            smart=smart,
+            fit_in=fit_in,
+            image_url=quote_url(source),
+        )
+        assert generate_or_error(fast, options) == generate_or_error(
+            reference, options
+        ), options
+
+
+def test_sign_bytes_matches_sign():
+    signer = FastCryptoURL("secret")
+    path = "300x200/smart/" + quote_url(SOURCES[2])
+    assert signer.sign_bytes(path.encode("ascii")).decode("ascii") == signer.sign(path)
+
+
+def test_key_ring_signs_like_one_signer_per_key():
+    path = "300x200/smart/" + quote_url(SOURCES[1])
+    assert KeyRing(KEYS).generate_paths(path) == [
+        FastCryptoURL(key).generate_path(path) for key in KEYS
+    ]
+
+
+@pytest.mark.parametrize("source", SOURCES)
+def test_engines_and_presets_generate_the_same_urls(source):
+    fast = ThumborUrlGenerator("https://img", "secret", engine="fast")
+    reference = ThumborUrlGenerator("https://img", "secret", engine="libthumbor")
+    expected = reference.generate(source, "300", "200", True)
+    assert fast.generate(source, "300", "200", True) == expected
+    preset = Preset("300x200", "300", "200", True)
+    assert fast.generate_preset(source, preset) == expected
+    assert reference.generate_preset(source, preset) == expected
@@ -0,0 +1,65 @@
+import json
+import sys
+
+import pytest
+from conftest import BASE_URL, KEY
+
+from thumbor_url_generator.generator import (
+    ENGINES,
+    ThumborUrlGenerator,
+    format_srcset,
+)
+
+WIDTHS = [320, 640, 1280]
+SOURCE = "https://例え.jp/画像/写真 1.jpeg"
+
+
+@pytest.mark.parametrize("engine", list(ENGINES))
+@pytest.mark.parametrize("unsafe", [False, True])
+@pytest.mark.parametrize("height, smart", [(0, True), (400, False)])
+def test_srcset_matches_generate_per_width(engine, unsafe, height, smart):
+    generator = ThumborUrlGenerator(BASE_URL, KEY, engine)
+    entries = generator.srcset(SOURCE, WIDTHS, height, smart, unsafe)
+    assert entries == [
+        (width, generator.generate(SOURCE, width, height, smart, unsafe))
+        for width in WIDTHS
+    ]
+
+
+def test_format_srcset():
+    assert format_srcset([(320, "a"), (640, "b")]) == "a 320w, b 640w"
+
+
+def run_cli(monkeypatch, tmp_path, *argv):
+    from thumbor_url_generator.cli import main
+
+    monkeypatch.setenv("THUMBOR_BASE_URL", BASE_URL)
+    monkeypatch.setenv("THUMBOR_KEY", KEY)
+    config = tmp_path / "config"
+    config.write_text("")
+    argv = ["thumbor-url-generator", "-e", str(config), *argv]
+    monkeypatch.setattr(sys, "argv", argv)
+    main()
+
+
+def test_cli_srcset_json_shape(monkeypatch, tmp_path, capsys):
+    run_cli(monkeypatch, tmp_path, "--srcset", "320,640", "--json", "-H", "0", "a.jpg")
+    generator = ThumborUrlGenerator(BASE_URL, KEY)
+    assert json.loads(capsys.readouterr().out) == [
+        {"width": width, "url": generator.generate("a.jpg", width, 0)}
+        for width in (320, 640)
+    ]
+
+
+def test_cli_srcset_copies_what_it_prints(monkeypatch, tmp_path, capsys):
+    from thumbor_url_generator import cli
+
+    copied = []
+    monkeypatch.setattr(cli, "copy", copied.append)
+    run_cli(monkeypatch, tmp_path, "--srcset", "320", "-H", "0", "-c", "a.jpg")
+    assert copied == [capsys.readouterr().out.rstrip("\n")]
+
+
+def test_cli_srcset_rejects_preset(monkeypatch, tmp_path):
+    with pytest.raises(SystemExit):
+        run_cli(monkeypatch, tmp_path, "--srcset", "320", "-p", "thumb", "a.jpg")
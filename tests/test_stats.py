@@ -0,0 +1,48 @@
+import io
+import sys
+
+import pytest
+from conftest import BASE_URL, KEY
+
+from thumbor_url_generator import generator
+from thumbor_url_generator.batch import generate_batch, read_batch
+from thumbor_url_generator.cli import parse_args
+from thumbor_url_generator.signer import FastCryptoURL
+from thumbor_url_generator.stats import SAMPLE_EVERY, RunStats
+
+
+def test_overhead_is_calibrated_once():
+    stats = RunStats()
+    stats.measure_overhead(samples=100)
+    calibrated = stats.call_overhead
+    assert calibrated is not None
+    stats.measure_overhead(samples=100)
+    assert stats.call_overhead is calibrated
+
+
+def test_report_says_what_jobs_workers_do_not_collect():
+    stats = RunStats()
+    stats.jobs = 4
+    stats.urls = 10
+    out = io.StringIO()
+    stats.report(out)
+    assert "not collected from the 4 --jobs workers" in out.getvalue()
+    assert "latency us" not in out.getvalue()
+
+
+def test_batch_loop_samples_urls_without_patching():
+    sign, quote_url = FastCryptoURL.sign, generator.quote_url
+    stats = RunStats()
+    lines = [f"img/{i}.jpg" for i in range(SAMPLE_EVERY * 3 + 1)]
+    out = io.StringIO()
+    generate_batch(read_batch(lines), out, BASE_URL, KEY, 300, 200, stats=stats)
+    assert stats.timer.histograms["url"].count == 4
+    assert (FastCryptoURL.sign, generator.quote_url) == (sign, quote_url)
+    assert stats.timer.patched == []
+
+
+def test_stats_interval_requires_stats(monkeypatch):
+    argv = ["thumbor-url-generator", "-i", "urls.txt", "--stats-interval", "5"]
+    monkeypatch.setattr(sys, "argv", argv)
+    with pytest.raises(SystemExit):
+        parse_args()
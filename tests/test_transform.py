@@ -0,0 +1,51 @@
+import io
+import json
+
+import pytest
+from conftest import BASE_URL, KEY
+
+from thumbor_url_generator.generator import ThumborUrlGenerator
+from thumbor_url_generator.presets import Preset
+from thumbor_url_generator.transform import transform_file
+
+THUMB = Preset.parse("thumb", "200x200 smart")
+
+
+def transform(text: str, file_format: str, jobs=1) -> str:
+    out = io.StringIO()
+    transform_file(
+        io.StringIO(text, newline=""),
+        out,
+        file_format,
+        "url",
+        [("url_thumb", THUMB)],
+        BASE_URL,
+        KEY,
+        jobs=jobs,
+        chunk_size=2,
+    )
+    return out.getvalue()
+
+
+def thumb(url: str) -> str:
+    return ThumborUrlGenerator(BASE_URL, KEY).generate_preset(url, THUMB)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_jsonl_copies_lines_that_are_not_objects(jobs):
+    text = '{"url": "a.jpg", "id": 1}\n[1, 2]\nnot json\n\n{"id": 2}\n'
+    lines = transform(text, "jsonl", jobs).splitlines()
+    assert json.loads(lines[0]) == {
+        "url": "a.jpg",
+        "url_thumb": thumb("a.jpg"),
+        "id": 1,
+    }
+    assert lines[1:3] == ["[1, 2]", "not json"]
+    assert json.loads(lines[3]) == {"id": 2, "url_thumb": ""}
+
+
+def test_csv_keeps_quoted_line_breaks():
+    text = 'id,url,title\r\n1,a.jpg,"two\r\nlines"\r\n'
+    assert transform(text, "csv") == (
+        f'id,url,url_thumb,title\n1,a.jpg,{thumb("a.jpg")},"two\r\nlines"\n'
+    )
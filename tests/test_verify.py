@@ -0,0 +1,31 @@
+import io
+
+import pytest
+from conftest import BASE_URL
+
+from thumbor_url_generator.generator import ThumborUrlGenerator
+from thumbor_url_generator.verify import verify_batch
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_verify_batch_reports_every_url_that_is_not_valid(jobs):
+    new = ThumborUrlGenerator(BASE_URL, "new").generate("a.jpg", 300, 200)
+    old = ThumborUrlGenerator(BASE_URL, "old").generate("b.jpg", 300, 200)
+    other = ThumborUrlGenerator(BASE_URL, "other").generate("c.jpg", 300, 200)
+    unsafe = ThumborUrlGenerator(BASE_URL).generate("d.jpg", 300, 200)
+    urls = [new, old, other, unsafe, "nonsense"]
+    out = io.StringIO()
+    counts = verify_batch(urls, out, BASE_URL, ["new", "old"], jobs, chunk_size=2)
+    assert counts == {
+        "valid": 1,
+        "old_key": 1,
+        "mismatch": 1,
+        "unsafe": 1,
+        "malformed": 1,
+    }
+    assert out.getvalue().splitlines() == [
+        f"old_key\t{old}",
+        f"mismatch\t{other}",
+        f"unsafe\t{unsafe}",
+        "malformed\tnonsense",
+    ]
@@ -0,0 +1,23 @@
+"""Generates safe (signed) and unsafe urls for a thumbor server.
+
+Importing the package has no side effects: logging is left unconfigured and
+pyperclip/dotenv are only imported when copying or loading an env file.
+The command line interface lives in :mod:`thumbor_url_generator.cli`.
+"""
+from .cache import UrlCache
+from .generator import (
+    ThumborUrlGenerator,
+    encode_url,
+    format_srcset,
+    generate_safe_url,
+    generate_unsafe_url,
+)
+
+__all__ = [
+    "ThumborUrlGenerator",
+    "UrlCache",
+    "encode_url",
+    "format_srcset",
+    "generate_safe_url",
+    "generate_unsafe_url",
+]
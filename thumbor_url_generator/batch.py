@@ -0,0 +1,431 @@
+"""Batch mode: streams records from a file and writes one url per line."""
+import json
+import logging
+import time
+from collections import Counter, deque
+from itertools import islice
+from multiprocessing import Pool, util
+from multiprocessing.pool import AsyncResult
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+)
+
+from .disk_cache import DiskUrlCache
+from .generator import DEFAULT_ENGINE, ThumborUrlGenerator
+from .shard import INDEX_KEY
+
+if TYPE_CHECKING:
+    from .dedupe import DedupeSigner
+
+logger = logging.getLogger(__name__)
+
+# Records grouped and deduplicated together by the single process --dedupe path.
+DEDUPE_WINDOW = 10_000
+# Record key carrying the input line number, for error messages.
+LINE_KEY = "_line"
+# Output line of a record that failed to sign, keeping output aligned with input.
+FAILED_URL = ""
+NO_URL = "record has no url"
+# Record key marking a line parse_record() rejected, written out as FAILED_URL.
+REJECTED_KEY = "_rejected"
+
+# Per-process state of WorkerPool workers, set up once by _init_worker.
+_worker_state = None
+_worker_process: Optional[Callable] = None
+
+
+def record_error(record) -> Optional[str]:
+    """Returns why record is not a valid batch record, or None if it is.
+
+    url must be a non-empty string, width and height non-negative ints,
+    smart and unsafe bools and preset a string; other keys are ignored.
+    """
+    if not isinstance(record, dict) or not record.get("url"):
+        return NO_URL
+    if not isinstance(record["url"], str):
+        return "url must be a string"
+    for key in ("width", "height"):
+        if key in record:
+            value = record[key]
+            if type(value) is not int or value < 0:
+                return f"{key} must be a non-negative integer"
+    for key in ("smart", "unsafe"):
+        if key in record and not isinstance(record[key], bool):
+            return f"{key} must be true or false"
+    if "preset" in record and not isinstance(record["preset"], str):
+        return "preset must be a string"
+    return None
+
+
+def parse_record(line, line_no: int, errors: Optional[Counter] = None):
+    """Returns the record of a JSON line (str or bytes), or None if invalid.
+
+    Invalid lines are logged and, if errors is given, counted in it by
+    reason (invalid_json, missing_url or invalid_record).
+    """
+    try:
+        record = json.loads(line)
+    except ValueError as err:
+        logger.error("Line %d: invalid JSON record: %s", line_no, err)
+        if errors is not None:
+            errors["invalid_json"] += 1
+        return None
+    error = record_error(record)
+    if error is not None:
+        logger.error("Line %d: %s", line_no, error)
+        if errors is not None:
+            errors["missing_url" if error == NO_URL else "invalid_record"] += 1
+        return None
+    record[LINE_KEY] = line_no
+    return record
+
+
+def read_batch(in_file: TextIO, errors: Optional[Counter] = None) -> Iterator[dict]:
+    """Yields one record per non-empty line, either a bare URL or a JSON object.
+
+    JSON records take the keys url, width, height, smart, unsafe and preset;
+    missing keys fall back to the command line/config values. Invalid lines,
+    see parse_record(), yield a record with an empty url and REJECTED_KEY
+    set, which is written out as FAILED_URL so output lines stay aligned
+    with input lines. Each record carries its line number under LINE_KEY.
+    """
+    for line_no, line in enumerate(in_file, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            record = parse_record(line, line_no, errors)
+            if record is None:
+                record = {"url": "", LINE_KEY: line_no, REJECTED_KEY: True}
+            yield record
+        else:
+            yield {"url": line, LINE_KEY: line_no}
+
+
+def generate_record(
+    generator: ThumborUrlGenerator,
+    record: dict,
+    img_width,
+    img_height,
+    is_smart=True,
+    is_unsafe=False,
+    preset=None,
+    all_keys=False,
+) -> str:
+    """Generates the url for one batch record, filling in the defaults.
+
+    A record's preset, or the default preset, takes precedence over its
+    width, height and smart values. With all_keys, the urls signed under
+    every key of the generator's thumbor_keys are joined by tabs.
+    """
+    preset = record.get("preset", preset)
+    if all_keys:
+        return "\t".join(
+            generator.generate_all(
+                record["url"],
+                str(record.get("width", img_width)),
+                str(record.get("height", img_height)),
+                record.get("smart", is_smart),
+                record.get("unsafe", is_unsafe),
+                preset,
+            )
+        )
+    if preset is not None:
+        return generator.generate_preset(
+            record["url"], preset, record.get("unsafe", is_unsafe)
+        )
+    return generator.generate(
+        record["url"],
+        str(record.get("width", img_width)),
+        str(record.get("height", img_height)),
+        record.get("smart", is_smart),
+        record.get("unsafe", is_unsafe),
+    )
+
+
+def sign_record(
+    generator: ThumborUrlGenerator, record: dict, defaults: tuple, errors: Counter
+) -> str:
+    """Returns generate_record()'s url, or FAILED_URL if it raises.
+
+    Failures are logged with the record's line number and counted in errors.
+    Rejected records, already counted by parse_record(), get FAILED_URL too.
+    """
+    if REJECTED_KEY in record:
+        return FAILED_URL
+    try:
+        return generate_record(generator, record, *defaults)
+    except Exception as err:
+        logger.error("Line %s: %s", record.get(LINE_KEY, "?"), err)
+        errors["sign_failed"] += 1
+        return FAILED_URL
+
+
+def chunked(records: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    """Yields lists of up to size records."""
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def make_generator(
+    thumbor_base_url: str,
+    thumbor_key: Optional[str],
+    engine=DEFAULT_ENGINE,
+    cache_size=0,
+    disk_cache=None,
+    presets=None,
+    thumbor_keys=None,
+) -> ThumborUrlGenerator:
+    """Builds the batch generator, backed by a DiskUrlCache if disk_cache is set."""
+    cache = None
+    if disk_cache is not None:
+        cache = DiskUrlCache(disk_cache, thumbor_base_url, thumbor_key)
+    return ThumborUrlGenerator(
+        thumbor_base_url,
+        thumbor_key,
+        engine,
+        cache_size=cache_size,
+        cache=cache,
+        presets=presets,
+        thumbor_keys=thumbor_keys,
+    )
+
+
+def _init_worker(setup: Callable, args: tuple, process: Callable):
+    global _worker_state, _worker_process
+    _worker_state = setup(*args)
+    _worker_process = process
+
+
+def _process_chunk(chunk: list):
+    return _worker_process(_worker_state, chunk)
+
+
+class WorkerPool:
+    """Process pool for --jobs whose workers set up their state once.
+
+    setup(*args) runs once in each worker process, e.g. to build the
+    generator; process(state, chunk) then handles every chunk sent to that
+    worker. setup and process must be module level functions. Leaving the
+    with block closes the pool and waits for the workers, so their
+    util.Finalize callbacks run; on an exception the workers are terminated.
+    """
+
+    def __init__(self, jobs: int, setup: Callable, args: tuple, process: Callable):
+        self.pool = Pool(
+            jobs, initializer=_init_worker, initargs=(setup, args, process)
+        )
+
+    def __enter__(self) -> "WorkerPool":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.pool.close()
+            self.pool.join()
+        else:
+            self.pool.terminate()
+
+    def imap(self, chunks: Iterable[list]) -> Iterator:
+        """Yields the result of each chunk, in order."""
+        return self.pool.imap(_process_chunk, chunks)
+
+    def apply_async(self, chunk: list) -> AsyncResult:
+        """Sends one chunk to the pool, returns its pending result."""
+        return self.pool.apply_async(_process_chunk, (chunk,))
+
+
+def _setup_worker(
+    thumbor_base_url: str,
+    thumbor_key: Optional[str],
+    options: dict,
+    defaults: tuple,
+    dedupe=False,
+) -> Tuple[ThumborUrlGenerator, tuple, Optional["DedupeSigner"]]:
+    """Builds the generator, and DedupeSigner if dedupe, of a worker process."""
+    generator = make_generator(thumbor_base_url, thumbor_key, **options)
+    if generator.cache is not None:
+        # Runs when the worker exits after the pool is closed and joined.
+        util.Finalize(generator.cache, generator.cache.close, exitpriority=10)
+    signer = None
+    if dedupe:
+        from .dedupe import DedupeSigner
+
+        signer = DedupeSigner(generator, defaults)
+        util.Finalize(signer, signer.close, exitpriority=10)
+    return generator, defaults, signer
+
+
+def output_line(record: dict, url: str) -> str:
+    """Returns the output line for a record, prefixed by its shard index if any."""
+    index = record.get(INDEX_KEY)
+    return url if index is None else f"{index}\t{url}"
+
+
+def _generate_chunk(
+    state: tuple, chunk: List[dict]
+) -> Tuple[List[str], Counter, Counter]:
+    """Generates the output lines for a chunk of records in a worker process.
+
+    Returns them with the errors counted while signing and, with dedupe, the
+    urls signed and reused for the chunk.
+    """
+    generator, defaults, signer = state
+    errors: Counter = Counter()
+    if signer is not None:
+        before = signer.counts.copy()
+        urls = signer.sign(chunk, errors)
+        return list(map(output_line, chunk, urls)), errors, signer.counts - before
+    lines = [
+        output_line(record, sign_record(generator, record, defaults, errors))
+        for record in chunk
+    ]
+    return lines, errors, Counter()
+
+
+def _tracked(
+    chunks: Iterator[List[dict]], checkpoint, offsets: deque
+) -> Iterator[List[dict]]:
+    """Yields the chunks, appending the input position after each to offsets."""
+    for chunk in chunks:
+        offsets.append(checkpoint.position())
+        yield chunk
+
+
+def generate_batch(
+    records: Iterator[dict],
+    out_file: TextIO,
+    thumbor_base_url: str,
+    thumbor_key: Optional[str],
+    img_width,
+    img_height,
+    is_smart=True,
+    is_unsafe=False,
+    jobs=1,
+    chunk_size=1000,
+    engine=DEFAULT_ENGINE,
+    cache_size=0,
+    disk_cache=None,
+    presets=None,
+    preset=None,
+    stats=None,
+    thumbor_keys=None,
+    all_keys=False,
+    checkpoint=None,
+    dedupe=False,
+    errors: Optional[Counter] = None,
+) -> int:
+    """Writes one generated url per record to out_file, returns the count.
+
+    With jobs > 1 the records are sent in chunks to a process pool; output
+    keeps the input order. A cache_size above 0 gives each process an LRU
+    cache of that many urls, and disk_cache is the path of a DiskUrlCache
+    shared by all processes and runs; with both, the LRU is checked first.
+    preset names the default entry of presets used for records without their
+    own. stats, a RunStats, gets the url count and the cache of the single
+    process path. With all_keys, each line holds the urls signed under every
+    key in thumbor_keys, tab separated. checkpoint, a BatchCheckpoint whose
+    reader feeds records and whose output is out_file, is saved every
+    checkpoint.every urls and at the end. With dedupe, records are signed in
+    windows by a DedupeSigner (one per process), so each distinct url and
+    option set is signed once; stats.dedupe gets the signed and reused
+    counts. A record that fails to sign is logged, counted in errors
+    (stats.errors by default) and written as FAILED_URL, an empty line.
+    """
+    defaults = (img_width, img_height, is_smart, is_unsafe, preset, all_keys)
+    options = {
+        "engine": engine,
+        "cache_size": cache_size,
+        "disk_cache": disk_cache,
+        "presets": presets,
+        "thumbor_keys": thumbor_keys,
+    }
+    if errors is None:
+        errors = stats.errors if stats is not None else Counter()
+    count = 0
+    if jobs > 1:
+        if stats is not None:
+            stats.jobs = jobs
+        # Input offset after each chunk, appended as the pool reads it.
+        offsets: deque = deque()
+        chunks = chunked(records, chunk_size)
+        if checkpoint is not None:
+            chunks = _tracked(chunks, checkpoint, offsets)
+        saved = 0
+        setup_args = (thumbor_base_url, thumbor_key, options, defaults, dedupe)
+        with WorkerPool(jobs, _setup_worker, setup_args, _generate_chunk) as pool:
+            for urls, chunk_errors, chunk_dedupe in pool.imap(chunks):
+                out_file.write("\n".join(urls) + "\n")
+                count += len(urls)
+                errors.update(chunk_errors)
+                if stats is not None:
+                    stats.urls = count
+                    stats.dedupe.update(chunk_dedupe)
+                if checkpoint is not None:
+                    position = offsets.popleft()
+                    if count - saved >= checkpoint.every:
+                        checkpoint.save(position, count)
+                        saved = count
+        if checkpoint is not None:
+            checkpoint.save(checkpoint.position(), count)
+        if stats is not None:
+            stats.urls = count
+        return count
+
+    generator = make_generator(thumbor_base_url, thumbor_key, **options)
+    if stats is not None:
+        stats.cache = generator.cache
+    signer = None
+    if dedupe:
+        from .dedupe import DedupeSigner
+
+        signer = DedupeSigner(
+            generator, defaults, counts=stats.dedupe if stats is not None else None
+        )
+    try:
+        if signer is not None:
+            saved = 0
+            for window in chunked(records, DEDUPE_WINDOW):
+                lines = map(output_line, window, signer.sign(window, errors))
+                out_file.write("\n".join(lines) + "\n")
+                count += len(window)
+                if checkpoint is not None and count - saved >= checkpoint.every:
+                    checkpoint.save(checkpoint.position(), count)
+                    saved = count
+        else:
+            # With stats, one record in every is timed as the url stage.
+            every, observe = stats.sampler("url") if stats is not None else (0, None)
+            for record in records:
+                if observe is None or count % every:
+                    url = sign_record(generator, record, defaults, errors)
+                else:
+                    start = time.perf_counter()
+                    url = sign_record(generator, record, defaults, errors)
+                    observe(time.perf_counter() - start)
+                out_file.write(output_line(record, url) + "\n")
+                count += 1
+                if checkpoint is not None and count % checkpoint.every == 0:
+                    checkpoint.save(checkpoint.position(), count)
+    finally:
+        if signer is not None:
+            signer.close()
+        if generator.cache is not None:
+            generator.cache.close()
+    if checkpoint is not None:
+        checkpoint.save(checkpoint.position(), count)
+    if generator.cache is not None:
+        logger.info("Cache: %s", generator.cache.stats())
+    if stats is not None:
+        stats.urls = count
+    return count
@@ -0,0 +1,95 @@
+"""Bounded in-memory LRU cache of generated urls."""
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class UrlCache:
+    """LRU cache mapping generation options to urls, with hit/miss counters.
+
+    Keys are (image_url, width, height, smart, unsafe) tuples. Once max_entries
+    is reached the least recently used url is evicted.
+    """
+
+    def __init__(self, max_entries=1024):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Returns the cached url for key, or None, and counts the lookup."""
+        url = self.entries.get(key)
+        if url is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return url
+
+    def put(self, key: Hashable, url: str) -> None:
+        """Stores url under key, evicting the least recently used entry if full."""
+        self.entries[key] = url
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def close(self) -> None:
+        """Does nothing, for the same interface as DiskUrlCache."""
+
+    def stats(self) -> dict:
+        """Returns the entry count and hit/miss/eviction counters."""
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class TieredUrlCache:
+    """A UrlCache in front of a slower cache with the same interface.
+
+    Lookups missing the front cache go to the back one, e.g. a DiskUrlCache,
+    and its hits are copied to the front; new urls are stored in both.
+    """
+
+    def __init__(self, front: UrlCache, back):
+        self.front = front
+        self.back = back
+
+    def __len__(self) -> int:
+        return len(self.front)
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Returns the cached url for key from either cache, or None."""
+        url = self.front.get(key)
+        if url is None:
+            url = self.back.get(key)
+            if url is not None:
+                self.front.put(key, url)
+        return url
+
+    def put(self, key: Hashable, url: str) -> None:
+        self.front.put(key, url)
+        self.back.put(key, url)
+
+    def close(self) -> None:
+        self.back.close()
+
+    def stats(self) -> dict:
+        """Returns the front cache stats, counting back cache hits as hits."""
+        stats = self.front.stats()
+        stats.update(
+            hits=self.front.hits + self.back.hits,
+            misses=self.back.misses,
+            back=self.back.stats(),
+        )
+        return stats
@@ -0,0 +1,141 @@
+"""Catalogue mode: signs a source url column of a sqlite table in place.
+
+The signed url goes into a target column and a short fingerprint of the
+config, preset and source into <target>_fingerprint. A row is only
+rewritten when its fingerprint differs, so re-runs after changing a few
+sources, the preset or the key touch just the affected rows. Rows are read
+in rowid order by keyset pagination and written with executemany, one
+transaction per batch.
+"""
+import hashlib
+import logging
+import sqlite3
+from collections import Counter
+from typing import Optional
+
+from .disk_cache import config_fingerprint
+from .generator import DEFAULT_ENGINE, ThumborUrlGenerator
+from .presets import Preset
+
+logger = logging.getLogger(__name__)
+
+
+def quote_identifier(name: str) -> str:
+    """Quotes a table or column name for sqlite."""
+    return '"%s"' % name.replace('"', '""')
+
+
+def row_fingerprint(settings: bytes, source: Optional[str]) -> str:
+    """Returns the fingerprint stored next to a signed url."""
+    material = settings + (source or "").encode("utf-8")
+    return hashlib.sha1(material).hexdigest()[:20]
+
+
+class Catalogue:
+    """Signs table.source_column into table.target_column of a sqlite database."""
+
+    def __init__(self, path, table: str, source_column: str, target_column: str):
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.table = quote_identifier(table)
+        self.source = quote_identifier(source_column)
+        self.target = quote_identifier(target_column)
+        self.fingerprint = quote_identifier(target_column + "_fingerprint")
+        columns = [
+            row[1]
+            for row in self.connection.execute(f"PRAGMA table_info({self.table})")
+        ]
+        if not columns:
+            raise Exception(f"Table {table!r} does not exist")
+        if source_column not in columns:
+            raise Exception(f"Table {table!r} has no {source_column!r} column")
+        with self.connection:
+            for name in (target_column, target_column + "_fingerprint"):
+                if name not in columns:
+                    logger.info("Adding column %s to %s", name, table)
+                    column = quote_identifier(name)
+                    self.connection.execute(
+                        f"ALTER TABLE {self.table} ADD COLUMN {column} TEXT"
+                    )
+
+    def sign(
+        self,
+        generator: ThumborUrlGenerator,
+        preset: Preset,
+        is_unsafe=False,
+        batch_size=10000,
+        stats=None,
+    ) -> Counter:
+        """Signs every row whose fingerprint changed, returns scanned/updated counts.
+
+        Rows with an empty source get a NULL url. Rows whose source is not
+        text are logged, counted as invalid and left untouched.
+        """
+        config = config_fingerprint(generator.thumbor_base_url, generator.thumbor_key)
+        settings = f"{config}\0{preset.path}\0{bool(is_unsafe)}\0".encode("utf-8")
+        select = (
+            f"SELECT rowid, {self.source}, {self.fingerprint} FROM {self.table}"
+            " WHERE rowid > ? ORDER BY rowid LIMIT ?"
+        )
+        update = (
+            f"UPDATE {self.table} SET {self.target} = ?, {self.fingerprint} = ?"
+            " WHERE rowid = ?"
+        )
+        counts: Counter = Counter()
+        last_rowid = -(2**63)
+        while True:
+            rows = self.connection.execute(select, (last_rowid, batch_size)).fetchall()
+            if not rows:
+                break
+            last_rowid = rows[-1][0]
+            changes = []
+            for rowid, source, old_fingerprint in rows:
+                if source is not None and not isinstance(source, str):
+                    logger.error(
+                        "Row %d: source is %s, not text", rowid, type(source).__name__
+                    )
+                    counts["invalid"] += 1
+                    continue
+                fingerprint = row_fingerprint(settings, source)
+                if fingerprint == old_fingerprint:
+                    continue
+                url = (
+                    generator.generate_preset(source, preset, is_unsafe)
+                    if source
+                    else None
+                )
+                changes.append((url, fingerprint, rowid))
+            if changes:
+                with self.connection:
+                    self.connection.executemany(update, changes)
+            counts["scanned"] += len(rows)
+            counts["updated"] += len(changes)
+            logger.info("Scanned %d rows, updated %d", counts["scanned"], len(changes))
+        if stats is not None:
+            stats.urls = counts["updated"]
+            if counts["invalid"]:
+                stats.errors["invalid_source"] += counts["invalid"]
+        return counts
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def sign_catalogue(
+    path,
+    table: str,
+    source_column: str,
+    target_column: str,
+    preset: Preset,
+    thumbor_base_url: str,
+    thumbor_key: Optional[str],
+    is_unsafe=False,
+    engine=DEFAULT_ENGINE,
+    stats=None,
+) -> Counter:
+    """Opens the catalogue at path, signs the changed rows and closes it."""
+    catalogue = Catalogue(path, table, source_column, target_column)
+    try:
+        generator = ThumborUrlGenerator(thumbor_base_url, thumbor_key, engine)
+        return catalogue.sign(generator, preset, is_unsafe, stats=stats)
+    finally:
+        catalogue.close()
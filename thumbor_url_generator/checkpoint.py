@@ -0,0 +1,141 @@
+"""Checkpoints for resumable batch runs.
+
+A checkpoint records the input byte offset just past the last record whose
+url was written (and, when sharding, the number of records read), the
+output byte offset and url count at that point, and the options of the
+run. It is saved every `every` urls: the output is flushed and fsynced,
+then the checkpoint is written to a temporary file, fsynced and renamed
+over the previous one, so a crash leaves either the old or the new
+checkpoint. Resuming truncates the output to the recorded offset and seeks
+the input to the recorded one, so no line is signed or written twice.
+"""
+import json
+import logging
+import os
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, TextIO, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Urls between checkpoints; each one costs two fsyncs.
+DEFAULT_EVERY = 100_000
+
+
+class OffsetReader:
+    """Iterates the decoded lines of a binary file, tracking the byte offset.
+
+    Lines end at \\n, \\r\\n or a lone \\r, like the universal newlines of
+    a file opened in text mode, so both paths see the same lines.
+    """
+
+    def __init__(self, raw: BinaryIO, offset=0):
+        self.raw = raw
+        self.offset = offset
+        if offset:
+            raw.seek(offset)
+
+    def __iter__(self) -> Iterator[str]:
+        for line in self.raw:
+            if b"\r" in line:
+                yield from self._split(line)
+            else:
+                self.offset += len(line)
+                yield line.decode("utf-8")
+
+    def _split(self, line: bytes) -> Iterator[str]:
+        """Yields the lines of a \\n terminated chunk holding \\r separators."""
+        end = b"\r\n" if line.endswith(b"\r\n") else b""
+        *parts, last = line[: len(line) - len(end)].split(b"\r")
+        for part in parts:
+            self.offset += len(part) + 1
+            yield part.decode("utf-8")
+        if last or end:
+            self.offset += len(last) + len(end)
+            yield last.decode("utf-8")
+
+
+class BatchCheckpoint:
+    """Opens the input and output of a batch run and checkpoints its progress.
+
+    The checkpoint lives next to the output as <output>.checkpoint. options
+    identify the run; resuming with other options is refused.
+    """
+
+    def __init__(self, output_path, options: dict, every=DEFAULT_EVERY):
+        self.output_path = Path(output_path)
+        self.path = self.output_path.with_name(self.output_path.name + ".checkpoint")
+        self.options = options
+        self.every = every
+        self.count = 0
+        self.state: Optional[dict] = None
+        self.reader: Optional[OffsetReader] = None
+        self.out_file: Optional[TextIO] = None
+        # A ShardSelector whose record index is saved with the offset.
+        self.selector = None
+
+    def load(self) -> Optional[dict]:
+        """Returns the saved checkpoint, or None if there is none."""
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                state = json.load(file)
+        except FileNotFoundError:
+            return None
+        if state.get("options") != self.options:
+            raise Exception(
+                f"{self.path} was written with other options, run without --resume"
+            )
+        return state
+
+    def open(self, input_path, resume=False) -> Tuple[OffsetReader, TextIO]:
+        """Opens the input and output, continuing from the checkpoint if resume.
+
+        Returns the input line reader and the output file.
+        """
+        state = self.state = self.load() if resume else None
+        if state is None:
+            # A stale checkpoint must not apply to the new output.
+            self.path.unlink(missing_ok=True)
+            self.out_file = open(self.output_path, "w", encoding="utf-8")
+            input_offset = 0
+        else:
+            logger.info("Resuming after %d urls", state["count"])
+            with open(self.output_path, "r+b") as file:
+                if file.seek(0, os.SEEK_END) < state["output_offset"]:
+                    raise Exception(f"{self.output_path} is shorter than {self.path}")
+                file.truncate(state["output_offset"])
+            self.out_file = open(self.output_path, "a", encoding="utf-8")
+            input_offset = state["input_offset"]
+            self.count = state["count"]
+        self.reader = OffsetReader(open(input_path, "rb"), input_offset)
+        return self.reader, self.out_file
+
+    def position(self) -> Tuple[int, Optional[int]]:
+        """Returns the input offset and, when sharding, the records read."""
+        records = None if self.selector is None else self.selector.index
+        return self.reader.offset, records
+
+    def save(self, position: Tuple[int, Optional[int]], count: int) -> None:
+        """Records that count more urls, for the input up to position, are out."""
+        self.out_file.flush()
+        os.fsync(self.out_file.fileno())
+        state = {
+            "input_offset": position[0],
+            "records": position[1],
+            "output_offset": self.out_file.buffer.tell(),
+            "count": self.count + count,
+            "options": self.options,
+        }
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(state, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+        logger.debug("Checkpoint: %s", state)
+
+    def close(self) -> None:
+        """Closes the input and output files."""
+        if self.reader is not None:
+            self.reader.raw.close()
+        if self.out_file is not None:
+            self.out_file.close()
@@ -0,0 +1,801 @@
+"""Command line interface."""
+import json
+import logging
+import sys
+from argparse import ArgumentParser
+from collections import Counter
+from contextlib import ExitStack
+from os import getenv
+from pathlib import Path
+from typing import IO, Optional, Tuple
+
+from .batch import LINE_KEY, generate_batch, make_generator, read_batch
+from .disk_cache import default_cache_path
+from .presets import Preset, parse_presets
+from .profiling import StageTimer
+from .shard import ShardSelector, parse_shard
+from .signer import FastCryptoURL, KeyRing
+from .stats import RunStats
+from .generator import (
+    DEFAULT_ENGINE,
+    ENGINES,
+    ThumborUrlGenerator,
+    copy,
+    format_srcset,
+    generate_safe_url,
+    generate_unsafe_url,
+)
+
+logger = logging.getLogger("thumbor_url_generator")
+
+
+def parse_args():
+    """Parses the arguments."""
+    parser = ArgumentParser(description="Thumbor URL generator")
+    parser.add_argument(
+        "-c", "--copy", default=False, action="store_true", help="Copy to clipboard"
+    )
+    parser.add_argument(
+        "--add-column",
+        metavar="NAME[=SPEC]",
+        action="append",
+        default=None,
+        help="With --transform, add a signed URL column for the preset NAME, or "
+        "for SPEC (e.g. thumb=200x200 smart); can be repeated",
+    )
+    parser.add_argument(
+        "--all-keys",
+        default=False,
+        action="store_true",
+        help="Sign under every key in THUMBOR_KEYS (e.g. new,old while rotating); "
+        "batch mode writes the urls tab separated on one line",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=0,
+        help="Batch mode: keep up to this many generated URLs in an LRU cache",
+    )
+    parser.add_argument(
+        "--catalogue",
+        metavar="DB",
+        default=None,
+        help="Sign --source-column of --table in this sqlite database into "
+        "--target-column, only rewriting rows that changed since the last run",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        metavar="N",
+        type=int,
+        default=100_000,
+        help="Batch mode with --output: checkpoint every N URLs, default is 100000",
+    )
+    parser.add_argument(
+        "--connect",
+        metavar="SOCKET",
+        default=None,
+        help="Client mode: send the URL or --input records to a --serve daemon, "
+        "with -W, -H, -u and -p for the keys the records do not set",
+    )
+    parser.add_argument(
+        "--dedupe",
+        default=False,
+        action="store_true",
+        help="Batch mode: sign each distinct URL and option set once, grouping "
+        "records by option set (spills to a temporary file on huge inputs)",
+    )
+    parser.add_argument(
+        "--disk-cache",
+        nargs="?",
+        const=True,
+        default=None,
+        help="Batch mode: persistent URL cache, default path is "
+        "$XDG_CACHE_HOME/thumbor-url-generator/urls.sqlite3",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=sorted(ENGINES),
+        default=DEFAULT_ENGINE,
+        help=f"Batch mode: signing engine, default is {DEFAULT_ENGINE}",
+    )
+    parser.add_argument("-e", "--env_file", default=None, help="Path to .env file")
+    parser.add_argument(
+        "--format",
+        choices=("csv", "jsonl"),
+        default=None,
+        help="With --transform, input format, default is guessed from the file name",
+    )
+    parser.add_argument("-H", "--height", type=int, help="Height of the image")
+    parser.add_argument(
+        "--http",
+        metavar="HOST:PORT",
+        default=None,
+        help="Server mode: answer POST /sign requests over HTTP on this address",
+    )
+    parser.add_argument(
+        "-i",
+        "--input",
+        default=None,
+        help="Batch mode: file with one image URL or JSON record per line, - for stdin",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Batch mode: number of worker processes, default is 1",
+    )
+    parser.add_argument(
+        "--merge",
+        metavar="FILE",
+        nargs="+",
+        default=None,
+        help="Merge --shard outputs back into input order, to --output or stdout",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="HOST:PORT",
+        default=None,
+        help="With --serve, also serve Prometheus metrics at /metrics on this "
+        "address (--http serves them on its own port)",
+    )
+    parser.add_argument(
+        "--mmap",
+        default=False,
+        action="store_true",
+        help="Batch mode: memory-map the --input file and sign its lines as bytes, "
+        "without decoding them (single process, no caches or checkpoints)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        metavar="FILE",
+        default=None,
+        help="Batch, --connect, --transform, --verify and --merge modes: write to "
+        "FILE instead of stdout; batch mode checkpoints progress to "
+        "FILE.checkpoint when --input is a file",
+    )
+    parser.add_argument(
+        "-p",
+        "--preset",
+        default=None,
+        help="Use a named preset from PRESETS in the config instead of the size",
+    )
+    parser.add_argument(
+        "--profile",
+        default=False,
+        action="store_true",
+        help="Print wall/CPU time per stage (config, read, encode, sign, logging, "
+        "copy, write) to stderr at exit",
+    )
+    parser.add_argument(
+        "--profile-output",
+        metavar="FILE",
+        default=None,
+        help="Dump a cProfile .pstats file for the whole run",
+    )
+    parser.add_argument(
+        "--resume",
+        default=False,
+        action="store_true",
+        help="Batch mode: continue an interrupted --output run from its checkpoint",
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="SOCKET",
+        default=None,
+        help="Daemon mode: answer JSON line requests on this Unix socket",
+    )
+    parser.add_argument(
+        "--stats",
+        default=False,
+        action="store_true",
+        help="Batch mode: print throughput, latency percentiles, peak memory, "
+        "cache hit ratio and error counts to stderr at exit",
+    )
+    parser.add_argument(
+        "--stats-interval",
+        metavar="SECONDS",
+        type=float,
+        default=None,
+        help="With --stats, also print the summary every SECONDS",
+    )
+    parser.add_argument(
+        "--shard",
+        metavar="i/N",
+        type=parse_shard,
+        default=None,
+        help="Batch mode: only sign the records in shard i of N (by a stable hash "
+        "of the URL), writing <index>\\t<url> lines for --merge",
+    )
+    parser.add_argument(
+        "--source-column",
+        default=None,
+        help="With --catalogue, column holding the image URLs",
+    )
+    parser.add_argument(
+        "--srcset",
+        metavar="WIDTHS",
+        default=None,
+        help="Generate a srcset for the comma separated widths, e.g. 320,640,1280",
+    )
+    parser.add_argument(
+        "--json",
+        default=False,
+        action="store_true",
+        help="With --srcset, print a JSON list of {width, url} instead",
+    )
+    parser.add_argument(
+        "-S", "--smart", default=True, action="store_true", help="Use smart cropping"
+    )
+    parser.add_argument(
+        "--transform",
+        metavar="COLUMN",
+        default=None,
+        help="Copy the CSV/JSONL --input to stdout with signed URL columns added "
+        "after the source URL column COLUMN",
+    )
+    parser.add_argument(
+        "--table", default=None, help="With --catalogue, table to sign"
+    )
+    parser.add_argument(
+        "--target-column",
+        default=None,
+        help="With --catalogue, column for the signed URLs, default is "
+        "<source column>_signed",
+    )
+    parser.add_argument(
+        "--tracemalloc",
+        default=False,
+        action="store_true",
+        help="With --stats, also trace allocations and report the peak (slow)",
+    )
+    parser.add_argument(
+        "-u", "--unsafe", default=False, action="store_true", help="Generate unsafe url"
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="count",
+        default=0,
+        help="Verbosity, can be used multiple times, default is disabled, -v for info, -vv for debug",
+    )
+    parser.add_argument(
+        "--verify",
+        default=False,
+        action="store_true",
+        help="Check the signed URL, or --input URLs, against THUMBOR_KEY(S) and "
+        "print <status>\\t<url> for each one that is not valid",
+    )
+    parser.add_argument("-W", "--width", type=int, help="Width of the image")
+    parser.add_argument("image_url", nargs="?", help="Image URL")
+    args = parser.parse_args()
+    if args.transform is not None and args.input is None:
+        parser.error("--transform requires --input")
+    if args.stats_interval is not None and not args.stats:
+        parser.error("--stats-interval requires --stats")
+    if args.srcset is not None and args.preset is not None:
+        parser.error("--srcset sets the widths itself and cannot use --preset")
+    if args.image_url is None and not (
+        args.input or args.serve or args.http or args.catalogue or args.merge
+    ):
+        parser.error(
+            "image_url is required unless --input, --serve, --http, --catalogue "
+            "or --merge is given"
+        )
+    if args.resume and (args.output is None or args.input in (None, "-")):
+        parser.error("--resume requires --output and an --input file")
+    if args.mmap and (
+        args.input in (None, "-")
+        or args.jobs > 1
+        or args.shard
+        or args.dedupe
+        or args.all_keys
+        or args.resume
+        or args.cache_size
+        or args.disk_cache
+    ):
+        parser.error(
+            "--mmap needs an --input file and cannot be combined with --jobs, "
+            "--shard, --dedupe, --all-keys, --resume, --cache-size or --disk-cache"
+        )
+    if args.checkpoint_every < 1:
+        parser.error("--checkpoint-every must be at least 1")
+    if args.catalogue is not None and not (args.table and args.source_column):
+        parser.error("--catalogue requires --table and --source-column")
+    if args.disk_cache is True:
+        # Resolved only when used: HOME may be unset, e.g. under cron.
+        try:
+            args.disk_cache = str(default_cache_path())
+        except Exception as err:
+            parser.error(f"--disk-cache: {err}, give a path")
+    return args
+
+
+def main():
+    """Runs the command line interface."""
+    args = parse_args()
+    logging.basicConfig(
+        level=logging.WARNING,
+        format="%(message)s",
+        handlers=[logging.StreamHandler()],
+    )
+    if args.verbose > 0:
+        if args.verbose == 1:
+            logger.setLevel(logging.INFO)
+        elif args.verbose == 2:
+            logger.setLevel(logging.DEBUG)
+    else:
+        logger.setLevel(logging.CRITICAL)
+
+    timer = StageTimer(enabled=args.profile)
+    stats = None
+    if args.stats:
+        stats = RunStats(args.tracemalloc)
+        if args.stats_interval:
+            stats.start_periodic(args.stats_interval)
+    profiler = None
+    if args.profile_output is not None:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        run(args, timer, stats)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile_output)
+        if stats is not None:
+            stats.timer.restore()
+            stats.stop()
+            stats.report(sys.stderr)
+        if timer.enabled:
+            timer.restore()
+            timer.report(sys.stderr)
+
+
+def instrument(timer: StageTimer):
+    """Times the encode, sign, logging and copy stages for --profile."""
+    from libthumbor import CryptoURL
+
+    from . import generator
+
+    timer.patch(generator, "quote_url", "encode")
+    timer.patch(CryptoURL, "generate", "sign")
+    timer.patch(FastCryptoURL, "sign", "sign")
+    timer.patch(KeyRing, "sign_all", "sign")
+    timer.patch(generator, "copy", "copy")
+    timer.patch(sys.modules[__name__], "copy", "copy")
+    for handler in logging.getLogger().handlers:
+        timer.patch(handler, "handle", "logging")
+
+
+def report_errors(errors: Counter) -> None:
+    """Prints the count of records that failed, which -v logs one by one."""
+    if errors:
+        details = ", ".join(f"{name}={count}" for name, count in errors.items())
+        print(
+            f"Failed records: {sum(errors.values())} ({details}), written as "
+            "empty lines; use -v to log each one",
+            file=sys.stderr,
+        )
+
+
+def open_streams(
+    stack: ExitStack, args, newline=None, buffering=-1
+) -> Tuple[Optional[IO], IO]:
+    """Opens --input and --output on stack, - and no --output meaning stdio.
+
+    The input is None without --input; newline applies to both files.
+    """
+    in_file = None
+    if args.input == "-":
+        if newline is not None:
+            sys.stdin.reconfigure(encoding="utf-8", newline=newline)
+        in_file = sys.stdin
+    elif args.input is not None:
+        in_file = stack.enter_context(
+            open(args.input, encoding="utf-8", newline=newline, buffering=buffering)
+        )
+    out_file = sys.stdout
+    if args.output is not None:
+        out_file = stack.enter_context(
+            open(args.output, "w", encoding="utf-8", newline=newline)
+        )
+    return in_file, out_file
+
+
+def default_preset(args, presets, width, height, smart) -> Preset:
+    """Returns the -p preset, or one for the width, height and smart options."""
+    if args.preset is not None:
+        return presets[args.preset]
+    return Preset(f"{width}x{height}", width, height, smart)
+
+
+def client_options(args) -> dict:
+    """Returns the record keys given as -W, -H, -u and -p, for --connect."""
+    options = {}
+    if args.width is not None:
+        options["width"] = args.width
+    if args.height is not None:
+        options["height"] = args.height
+    if args.unsafe:
+        options["unsafe"] = True
+    if args.preset is not None:
+        options["preset"] = args.preset
+    return options
+
+
+def client_record(options: dict, record: dict) -> dict:
+    """Returns the request for a record; its own keys override options."""
+    request = {**options, **record}
+    request.pop(LINE_KEY, None)
+    return request
+
+
+def run(args, timer: StageTimer, stats: Optional[RunStats] = None):
+    """Runs the mode selected by the arguments."""
+    if timer.enabled:
+        instrument(timer)
+
+    if args.connect is not None:
+        from .server import request_urls
+
+        options = client_options(args)
+        errors: Counter = Counter()
+        if args.input is None:
+            record = client_record(options, {"url": args.image_url})
+            print(next(request_urls(args.connect, [record], errors)))
+            report_errors(errors)
+            if errors:
+                sys.exit(1)
+            return
+        with ExitStack() as stack:
+            in_file, out_file = open_streams(stack, args)
+            records = (
+                client_record(options, record) for record in read_batch(in_file, errors)
+            )
+            for url in request_urls(args.connect, records, errors):
+                out_file.write(url + "\n")
+        report_errors(errors)
+        return
+
+    if args.merge is not None:
+        from .shard import merge_shards
+
+        with ExitStack() as stack:
+            in_files = [
+                stack.enter_context(open(path, encoding="utf-8")) for path in args.merge
+            ]
+            out_file = sys.stdout
+            if args.output is not None:
+                out_file = stack.enter_context(
+                    open(args.output, "w", encoding="utf-8")
+                )
+            total = merge_shards(in_files, out_file)
+        logger.info("Merged %d URLs", total)
+        return
+
+    env_file = args.env_file
+    if env_file is None:
+        env_file = (
+            getenv("XDG_CONFIG_HOME") + "/thumbor-url-generator/config"
+            if getenv("XDG_CONFIG_HOME") is not None
+            else getenv("HOME") + "/.config/thumbor-url-generator/config"
+        )
+    logger.debug("env_file: %s", env_file)
+    assert Path(env_file).exists(), f"{env_file} does not exist"
+    with timer.stage("config"):
+        from dotenv import load_dotenv
+
+        load_dotenv(env_file)
+
+    THUMBOR_BASE_URL = getenv("THUMBOR_BASE_URL")
+    assert THUMBOR_BASE_URL is not None, "THUMBOR_BASE_URL is not set"
+    e_keys = getenv("THUMBOR_KEYS")
+    THUMBOR_KEYS = [key for key in (e_keys or "").split(",") if key]
+    THUMBOR_KEY = getenv("THUMBOR_KEY")
+    if THUMBOR_KEY is None and THUMBOR_KEYS:
+        THUMBOR_KEY = THUMBOR_KEYS[0]
+    assert THUMBOR_KEY is not None, "THUMBOR_KEY is not set"
+    if args.all_keys and not THUMBOR_KEYS:
+        THUMBOR_KEYS = [THUMBOR_KEY]
+
+    e_width = getenv("WIDTH")
+    e_height = getenv("HEIGHT")
+    e_smart = getenv("SMART")
+    e_unsafe = getenv("UNSAFE")
+    e_copy = getenv("COPY")
+    e_presets = getenv("PRESETS")
+
+    logger.debug("Environment variables:")
+    logger.debug("THUMBOR_BASE_URL: %s", THUMBOR_BASE_URL)
+    logger.debug("THUMBOR_KEY: %s", THUMBOR_KEY)
+    logger.debug("THUMBOR_KEYS: %s", THUMBOR_KEYS)
+    logger.debug("WIDTH: %s", e_width)
+    logger.debug("HEIGHT: %s", e_height)
+    logger.debug("SMART: %s", e_smart)
+    logger.debug("COPY: %s", e_copy)
+    logger.debug("UNSAFE: %s", e_unsafe)
+    logger.debug("PRESETS: %s", e_presets)
+
+    presets = parse_presets(e_presets or "")
+    if args.preset is not None and args.preset not in presets:
+        logger.error("Unknown preset: %s", args.preset)
+        raise Exception(f"Unknown preset: {args.preset}")
+
+    if args.verify:
+        from .verify import OLD_KEY, VALID, read_urls, verify_batch
+
+        keys = THUMBOR_KEYS or [THUMBOR_KEY]
+        with ExitStack() as stack:
+            in_file, out_file = open_streams(stack, args)
+            counts = verify_batch(
+                read_urls(in_file) if in_file is not None else [args.image_url],
+                out_file,
+                THUMBOR_BASE_URL,
+                keys,
+                args.jobs,
+                stats=stats,
+            )
+        print(
+            "Verified %d URLs: %s"
+            % (
+                sum(counts.values()),
+                ", ".join(f"{count} {status}" for status, count in counts.items()),
+            ),
+            file=sys.stderr,
+        )
+        if sum(counts.values()) != counts[VALID] + counts[OLD_KEY]:
+            sys.exit(1)
+        return
+
+    width = args.width if args.width is not None else e_width
+    height = args.height if args.height is not None else e_height
+    smart = args.smart if args.smart is not None else e_smart
+    unsafe = args.unsafe if args.unsafe is not None else e_unsafe
+    cpy = args.copy if args.copy is not None else e_copy
+
+    if (
+        width is None
+        and height is None
+        and args.preset is None
+        and args.srcset is None
+        and args.add_column is None
+    ):
+        logger.error("Width or height is required")
+        raise Exception("Width or height is required")
+
+    if width is None:
+        width = 0
+    if height is None:
+        height = 0
+
+    logger.debug("\nFunction arguments:")
+    logger.debug("WIDTH: %s", width)
+    logger.debug("HEIGHT: %s", height)
+    logger.debug("SMART: %s", smart)
+    logger.debug("COPY: %s", cpy)
+    logger.debug("UNSAFE: %s", unsafe)
+    logger.debug("PRESET: %s", args.preset)
+
+    if args.serve is not None or args.http is not None:
+        generator = make_generator(
+            THUMBOR_BASE_URL,
+            THUMBOR_KEY,
+            args.engine,
+            args.cache_size,
+            args.disk_cache,
+            presets,
+        )
+        defaults = (width, height, smart, unsafe, args.preset)
+        if args.http is not None:
+            from .http_server import run_http
+
+            run_http(args.http, generator, defaults)
+        else:
+            from .server import serve
+
+            serve(args.serve, generator, defaults, args.metrics)
+        return
+
+    if args.catalogue is not None:
+        from .catalogue import sign_catalogue
+
+        counts = sign_catalogue(
+            args.catalogue,
+            args.table,
+            args.source_column,
+            args.target_column or f"{args.source_column}_signed",
+            default_preset(args, presets, width, height, smart),
+            THUMBOR_BASE_URL,
+            THUMBOR_KEY,
+            unsafe,
+            args.engine,
+            stats=stats,
+        )
+        print(
+            "Catalogue: scanned %d rows, updated %d"
+            % (counts["scanned"], counts["updated"]),
+            file=sys.stderr,
+        )
+        if counts["invalid"]:
+            print(
+                "Skipped %d rows whose source is not text; use -v to log each one"
+                % counts["invalid"],
+                file=sys.stderr,
+            )
+        return
+
+    if args.transform is not None:
+        from .transform import BUFFER_SIZE, guess_format, parse_columns, transform_file
+
+        if args.add_column is not None:
+            columns = parse_columns(args.add_column, presets)
+        else:
+            preset = default_preset(args, presets, width, height, smart)
+            columns = [(f"{args.transform}_{preset.name}", preset)]
+        with ExitStack() as stack:
+            # The csv module needs newline="" to keep quoted line breaks intact.
+            in_file, out_file = open_streams(
+                stack, args, newline="", buffering=BUFFER_SIZE
+            )
+            total = transform_file(
+                in_file,
+                timer.writer("write", out_file),
+                args.format or guess_format(args.input),
+                args.transform,
+                columns,
+                THUMBOR_BASE_URL,
+                THUMBOR_KEY,
+                unsafe,
+                args.jobs,
+                engine=args.engine,
+                stats=stats,
+            )
+        logger.info("Transformed %d rows", total)
+        return
+
+    if args.mmap:
+        from .mmap_reader import generate_batch_mmap
+
+        generator = make_generator(
+            THUMBOR_BASE_URL, THUMBOR_KEY, args.engine, presets=presets
+        )
+        # Sizes as strings, like generate_record passes them.
+        preset = default_preset(args, presets, str(width), str(height), smart)
+        sys.stdout.flush()
+        out_file = (
+            sys.stdout.buffer if args.output is None else open(args.output, "wb")
+        )
+        errors = stats.errors if stats else Counter()
+        try:
+            total = generate_batch_mmap(
+                args.input,
+                timer.writer("write", out_file),
+                generator,
+                preset,
+                (width, height, smart, unsafe, args.preset),
+                errors,
+                stats,
+            )
+        finally:
+            if out_file is not sys.stdout.buffer:
+                out_file.close()
+        logger.info("Generated %d URLs", total)
+        report_errors(errors)
+        return
+
+    if args.input is not None:
+        checkpoint = None
+        errors = stats.errors if stats else Counter()
+        with ExitStack() as stack:
+            if args.output is not None and args.input != "-":
+                from .checkpoint import BatchCheckpoint
+                from .disk_cache import config_fingerprint
+
+                options = {
+                    "input": str(Path(args.input).resolve()),
+                    "config": config_fingerprint(
+                        THUMBOR_BASE_URL,
+                        ",".join(THUMBOR_KEYS) if args.all_keys else THUMBOR_KEY,
+                    ),
+                    "defaults": [width, height, smart, unsafe, args.preset],
+                    "presets": {name: preset.path for name, preset in presets.items()},
+                    "all_keys": args.all_keys,
+                    "shard": args.shard and list(args.shard),
+                }
+                checkpoint = BatchCheckpoint(
+                    args.output, options, args.checkpoint_every
+                )
+                stack.callback(checkpoint.close)
+                in_file, out_file = checkpoint.open(args.input, args.resume)
+            else:
+                in_file, out_file = open_streams(stack, args)
+            records = read_batch(in_file, errors)
+            if args.shard is not None:
+                start = 0
+                if checkpoint is not None and checkpoint.state is not None:
+                    start = checkpoint.state["records"]
+                selector = ShardSelector(*args.shard, start=start)
+                records = selector.select(records)
+                if checkpoint is not None:
+                    checkpoint.selector = selector
+            total = generate_batch(
+                timer.iterate("read", records),
+                timer.writer("write", out_file),
+                THUMBOR_BASE_URL,
+                THUMBOR_KEY,
+                width,
+                height,
+                smart,
+                unsafe,
+                args.jobs,
+                engine=args.engine,
+                cache_size=args.cache_size,
+                disk_cache=args.disk_cache,
+                presets=presets,
+                preset=args.preset,
+                stats=stats,
+                thumbor_keys=THUMBOR_KEYS if args.all_keys else None,
+                all_keys=args.all_keys,
+                checkpoint=checkpoint,
+                dedupe=args.dedupe,
+                errors=errors,
+            )
+        logger.info("Generated %d URLs", total)
+        report_errors(errors)
+        return
+
+    if args.all_keys:
+        generator = ThumborUrlGenerator(
+            THUMBOR_BASE_URL, THUMBOR_KEY, presets=presets, thumbor_keys=THUMBOR_KEYS
+        )
+        urls = generator.generate_all(
+            args.image_url, width, height, smart, unsafe, args.preset
+        )
+        if cpy:
+            copy("\n".join(urls))
+        print()
+        for url in urls:
+            print("URL:", url)
+        return
+
+    if args.srcset is not None:
+        widths = [int(value) for value in args.srcset.split(",") if value.strip()]
+        generator = ThumborUrlGenerator(THUMBOR_BASE_URL, THUMBOR_KEY)
+        entries = generator.srcset(args.image_url, widths, height, smart, unsafe)
+        if args.json:
+            text = json.dumps([{"width": w, "url": url} for w, url in entries])
+        else:
+            text = format_srcset(entries)
+        if cpy:
+            copy(text)
+        print(text)
+        return
+
+    if args.preset is not None:
+        generator = ThumborUrlGenerator(THUMBOR_BASE_URL, THUMBOR_KEY, presets=presets)
+        url = generator.generate_preset(args.image_url, args.preset, unsafe)
+        if cpy:
+            copy(url)
+        print()
+        print("URL:", url)
+        return
+
+    url = (
+        generate_unsafe_url(THUMBOR_BASE_URL, args.image_url, width, height, smart, cpy)
+        if unsafe
+        else generate_safe_url(
+            THUMBOR_BASE_URL,
+            THUMBOR_KEY,
+            args.image_url,
+            width,
+            height,
+            smart,
+            cpy,
+        )
+    )
+    print()
+    print("URL:", url)
@@ -0,0 +1,188 @@
+"""Deduplicated, grouped signing of batch records.
+
+DedupeSigner signs a window of records by grouping them on their option
+set (size and smart, or preset, and unsafe) and signing each distinct
+source of a group once, through the generator's public methods and so its
+cache; results are fanned back out in record order. Signed urls are
+remembered across windows in a SpillingMemo: up to max_entries in memory,
+then spilled to a temporary sqlite DiskUrlCache, so memory stays bounded on
+huge inputs.
+"""
+import logging
+import shutil
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional
+
+from .batch import FAILED_URL, LINE_KEY, REJECTED_KEY
+from .disk_cache import DiskUrlCache
+from .generator import ThumborUrlGenerator
+
+logger = logging.getLogger(__name__)
+
+# Signed urls kept in memory before spilling to disk.
+DEFAULT_MAX_ENTRIES = 1_000_000
+
+
+class SpillingMemo:
+    """Dict of signed urls that moves to a temporary sqlite file when full."""
+
+    def __init__(
+        self,
+        generator: ThumborUrlGenerator,
+        max_entries=DEFAULT_MAX_ENTRIES,
+        spill_dir=None,
+    ):
+        self.generator = generator
+        self.max_entries = max_entries
+        self.spill_dir = spill_dir
+        self.entries: Dict[Hashable, str] = {}
+        self.spill: Optional[DiskUrlCache] = None
+        self.temp_dir: Optional[str] = None
+
+    def get(self, key: Hashable) -> Optional[str]:
+        url = self.entries.get(key)
+        if url is None and self.spill is not None:
+            url = self.spill.get(key)
+        return url
+
+    def put(self, key: Hashable, url: str) -> None:
+        self.entries[key] = url
+        if len(self.entries) >= self.max_entries:
+            self._spill_entries()
+
+    def _spill_entries(self) -> None:
+        """Moves every in-memory entry to the spill file."""
+        if self.spill is None:
+            self.temp_dir = tempfile.mkdtemp(
+                prefix="thumbor-url-generator-", dir=self.spill_dir
+            )
+            self.spill = DiskUrlCache(
+                Path(self.temp_dir) / "dedupe.sqlite3",
+                self.generator.thumbor_base_url,
+                self.generator.thumbor_key,
+                flush_every=self.max_entries + 1,
+            )
+            logger.info("Spilling deduplicated urls to %s", self.temp_dir)
+        for key, url in self.entries.items():
+            self.spill.put(key, url)
+        self.spill.flush()
+        self.entries.clear()
+
+    def close(self) -> None:
+        """Removes the spill file, if any."""
+        if self.spill is not None:
+            self.spill.close()
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+            self.spill = None
+
+
+class DedupeSigner:
+    """Signs windows of batch records, each distinct (url, options) once.
+
+    defaults are the batch defaults (width, height, smart, unsafe, preset,
+    all_keys) filled in for missing record keys, as in generate_record.
+    counts, e.g. a RunStats' dedupe, counts the urls "signed" and "reused".
+    """
+
+    def __init__(
+        self,
+        generator: ThumborUrlGenerator,
+        defaults: tuple,
+        max_entries=DEFAULT_MAX_ENTRIES,
+        spill_dir=None,
+        counts: Optional[Counter] = None,
+    ):
+        self.generator = generator
+        self.defaults = defaults
+        self.memo = SpillingMemo(generator, max_entries, spill_dir)
+        self.counts = Counter() if counts is None else counts
+
+    def options(self, record: dict) -> tuple:
+        """Returns the option set of a record, the key it is grouped by."""
+        width, height, smart, unsafe, preset = self.defaults[:5]
+        preset = record.get("preset", preset)
+        unsafe = bool(record.get("unsafe", unsafe))
+        if preset is not None:
+            return (preset, unsafe)
+        return (
+            str(record.get("width", width)),
+            str(record.get("height", height)),
+            bool(record.get("smart", smart)),
+            unsafe,
+        )
+
+    def sign(self, records: List[dict], errors: Optional[Counter] = None) -> List[str]:
+        """Returns the url for each record, in order.
+
+        Records that fail to sign get FAILED_URL; each is logged with its line
+        number and, if errors is given, counted in it as sign_failed. Rejected
+        records get FAILED_URL as well.
+        """
+        groups: Dict[tuple, Dict[str, Optional[str]]] = {}
+        keys: List[Optional[tuple]] = []
+        for record in records:
+            if REJECTED_KEY in record:
+                keys.append(None)
+                continue
+            options = self.options(record)
+            groups.setdefault(options, {})[record["url"]] = None
+            keys.append((options, record["url"]))
+        failures: Dict[tuple, Exception] = {}
+        new = 0
+        for options, urls in groups.items():
+            sign = self._signer(options)
+            for url in urls:
+                signed = self.memo.get((options, url))
+                if signed is None:
+                    try:
+                        signed = sign(url)
+                    except Exception as err:
+                        failures[options, url] = err
+                        continue
+                    self.memo.put((options, url), signed)
+                    new += 1
+                urls[url] = signed
+        results = [key and groups[key[0]][key[1]] for key in keys]
+        self.counts["signed"] += new
+        self.counts["reused"] += len(records) - new - results.count(None)
+        if failures:
+            self._log_failures(records, keys, failures, errors)
+        return [url or FAILED_URL for url in results]
+
+    @staticmethod
+    def _log_failures(records, keys, failures, errors: Optional[Counter]) -> None:
+        """Logs and counts every record whose (options, url) failed to sign."""
+        for record, key in zip(records, keys):
+            err = failures.get(key)
+            if err is not None:
+                logger.error("Line %s: %s", record.get(LINE_KEY, "?"), err)
+                if errors is not None:
+                    errors["sign_failed"] += 1
+
+    def _signer(self, options: tuple):
+        """Returns a function signing one source with the option set."""
+        generator = self.generator
+        unsafe = options[-1]
+        if len(options) == 2:
+            preset = options[0]
+            width, height, smart = 0, 0, False
+        else:
+            preset = None
+            width, height, smart = options[:3]
+        if self.defaults[5]:
+            return lambda url: "\t".join(
+                generator.generate_all(url, width, height, smart, unsafe, preset)
+            )
+        if preset is not None:
+            return lambda url: generator.generate_preset(url, preset, unsafe)
+        return lambda url: generator.generate(url, width, height, smart, unsafe)
+
+    def close(self) -> None:
+        logger.info(
+            "Dedupe: signed %d urls, reused %d",
+            self.counts["signed"],
+            self.counts["reused"],
+        )
+        self.memo.close()
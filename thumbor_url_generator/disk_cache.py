@@ -0,0 +1,123 @@
+"""Persistent sqlite cache of generated urls shared across runs."""
+import hashlib
+import logging
+import sqlite3
+from os import getenv
+from pathlib import Path
+from typing import Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS urls (key BLOB PRIMARY KEY, url TEXT NOT NULL);
+"""
+
+
+def default_cache_path() -> Path:
+    """Returns $XDG_CACHE_HOME/thumbor-url-generator/urls.sqlite3."""
+    cache_home = getenv("XDG_CACHE_HOME")
+    if cache_home is None:
+        if getenv("HOME") is None:
+            raise Exception("Neither XDG_CACHE_HOME nor HOME is set")
+        cache_home = getenv("HOME") + "/.cache"
+    return Path(cache_home) / "thumbor-url-generator" / "urls.sqlite3"
+
+
+def config_fingerprint(thumbor_base_url: str, thumbor_key: Optional[str]) -> str:
+    """Returns a hash identifying the base url and key, without storing the key."""
+    material = f"{thumbor_base_url}\0{thumbor_key or ''}".encode("utf-8")
+    return hashlib.sha256(material).hexdigest()
+
+
+class DiskUrlCache:
+    """sqlite backed url cache with the same get/put interface as UrlCache.
+
+    Rows are keyed by a SHA-1 of the config fingerprint, options and source
+    url. Opening the cache with a different THUMBOR_BASE_URL or THUMBOR_KEY
+    than the one it was filled with drops every row. Writes are buffered and
+    committed flush_every entries at a time; call close() to flush the rest.
+    The connection may be used from any thread, but only one at a time: the
+    servers sign under a lock or on their event loop.
+    """
+
+    def __init__(
+        self,
+        path,
+        thumbor_base_url: str,
+        thumbor_key: Optional[str],
+        flush_every=1000,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fingerprint = config_fingerprint(thumbor_base_url, thumbor_key)
+        self.flush_every = flush_every
+        self.pending: list = []
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        self._check_fingerprint()
+
+    def _check_fingerprint(self) -> None:
+        """Clears the cache if it was filled under another base url or key."""
+        with self.connection:
+            row = self.connection.execute(
+                "SELECT value FROM meta WHERE name = 'fingerprint'"
+            ).fetchone()
+            if row is not None and row[0] == self.fingerprint:
+                return
+            if row is not None:
+                logger.info("Config changed, clearing url cache %s", self.path)
+            self.connection.execute("DELETE FROM urls")
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)",
+                (self.fingerprint,),
+            )
+
+    def _row_key(self, key: Hashable) -> bytes:
+        material = "\0".join([self.fingerprint, *map(str, key)])
+        return hashlib.sha1(material.encode("utf-8")).digest()
+
+    def __len__(self) -> int:
+        (count,) = self.connection.execute("SELECT COUNT(*) FROM urls").fetchone()
+        return count + len(self.pending)
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Returns the cached url for key, or None, and counts the lookup."""
+        row = self.connection.execute(
+            "SELECT url FROM urls WHERE key = ?", (self._row_key(key),)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: Hashable, url: str) -> None:
+        """Queues url under key, committing once flush_every are pending."""
+        self.pending.append((self._row_key(key), url))
+        if len(self.pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes the pending urls in one transaction."""
+        if not self.pending:
+            return
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO urls VALUES (?, ?)", self.pending
+            )
+        self.pending = []
+
+    def close(self) -> None:
+        """Flushes pending urls and closes the database."""
+        self.flush()
+        self.connection.close()
+
+    def stats(self) -> dict:
+        """Returns the path and hit/miss counters."""
+        return {"path": str(self.path), "hits": self.hits, "misses": self.misses}
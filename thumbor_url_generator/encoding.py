@@ -0,0 +1,60 @@
+"""Table driven percent-encoding of source urls.
+
+quote_url(url) returns the same string as
+``urllib.parse.quote(url).replace("/", "%2F")``, i.e. quote with safe='',
+in a single pass over the utf-8 bytes. The encoded scheme://host prefix
+shared by most urls is memoised. BytesUrlEncoder does the same from bytes
+to bytes.
+"""
+from typing import Dict, Union
+
+ALWAYS_SAFE = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_.-~"
+# Escape for every byte value, e.g. ESCAPES[0x2F] == "%2F".
+ESCAPES = tuple(chr(b) if b in ALWAYS_SAFE else "%%%02X" % b for b in range(256))
+ESCAPE_BYTES = tuple(escape.encode("ascii") for escape in ESCAPES)
+
+
+class UrlEncoder:
+    """Callable percent-encoder with a bounded memo of encoded url prefixes."""
+
+    def __init__(self, max_prefixes=4096):
+        self.max_prefixes = max_prefixes
+        self.prefixes: Dict[Union[str, bytes], str] = {}
+
+    @staticmethod
+    def encode_bytes(data: bytes) -> str:
+        """Percent-encodes every byte outside ALWAYS_SAFE."""
+        return "".join([ESCAPES[b] for b in data])
+
+    def encode(self, url: Union[str, bytes]) -> str:
+        """Percent-encodes a str (as utf-8) or bytes url."""
+        if isinstance(url, str):
+            return self.encode_bytes(url.encode("utf-8"))
+        return self.encode_bytes(url)
+
+    def __call__(self, url: Union[str, bytes]) -> str:
+        """Encodes url, reusing the encoded scheme://host prefix if seen before."""
+        slash = "/" if isinstance(url, str) else b"/"
+        start = url.find(slash * 2)
+        end = url.find(slash, start + 2) if start > 0 else -1
+        if end < 0:
+            return self.encode(url)
+        prefix = url[:end]
+        encoded = self.prefixes.get(prefix)
+        if encoded is None:
+            if len(self.prefixes) >= self.max_prefixes:
+                self.prefixes.clear()
+            encoded = self.prefixes[prefix] = self.encode(prefix)
+        return encoded + self.encode(url[end:])
+
+
+class BytesUrlEncoder(UrlEncoder):
+    """UrlEncoder taking and returning bytes, for input read without decoding."""
+
+    @staticmethod
+    def encode_bytes(data: bytes) -> bytes:
+        """Percent-encodes every byte outside ALWAYS_SAFE into ascii bytes."""
+        return b"".join([ESCAPE_BYTES[b] for b in data])
+
+
+quote_url = UrlEncoder()
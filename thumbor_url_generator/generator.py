@@ -0,0 +1,298 @@
+"""Thumbor url generation: encoding, unsafe and signed (safe) urls."""
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from libthumbor import CryptoURL
+
+from .cache import TieredUrlCache, UrlCache
+from .encoding import quote_url
+from .presets import Preset
+from .signer import FastCryptoURL, KeyRing, option_path
+
+logger = logging.getLogger(__name__)
+
+# Signing engines for ThumborUrlGenerator, by name.
+ENGINES = {"libthumbor": CryptoURL, "fast": FastCryptoURL}
+# Engine used by the batch paths: keyed HMAC built once, copied per url.
+DEFAULT_ENGINE = "fast"
+
+
+def copy(text: str) -> None:
+    """Copies text to the clipboard, importing pyperclip only when needed."""
+    from pyperclip import copy as pyperclip_copy
+
+    pyperclip_copy(text)
+
+
+def encode_url(in_url: str) -> str:
+    """Encodes the url by replacing : with %3A and / with %2F."""
+    try:
+        t_url = quote_url(in_url)
+    except Exception as e:
+        logger.error(e)
+        raise e
+    logger.debug("Encoded URL: %s", t_url)
+    return t_url
+
+
+def generate_unsafe_url(
+    thumbor_base_url: str,
+    in_image_url: str,
+    img_width: int,
+    img_height: int,
+    is_smart=True,
+    is_copy=False,
+) -> str:
+    """Generates unsafe url for thumbor."""
+    encoded_url = encode_url(in_image_url)
+    if encode_url is None:
+        logger.error("Encoded URL is None")
+        raise Exception("Encoded URL is None")
+    unsafe_url = "%s/unsafe/%sx%s/%s%s" % (
+        thumbor_base_url,
+        img_width,
+        img_height,
+        "smart/" if is_smart else "",
+        encoded_url,
+    )
+    logger.info("Generated URL: %s", unsafe_url)
+    unsafe_url = unsafe_url.strip()
+    if is_copy:
+        copy(unsafe_url)
+    return unsafe_url
+
+
+def generate_safe_url(
+    thumbor_base_url,
+    thumbor_key,
+    in_image_url: str,
+    img_width: int,
+    img_height: int,
+    is_smart=True,
+    is_copy=False,
+) -> str:
+    """Generates safe url for thumbor."""
+    try:
+        crypto = CryptoURL(key=thumbor_key)
+    except Exception as err:
+        logger.error(err)
+        raise err
+
+    encoded_url: str = encode_url(in_image_url)
+    if encode_url is None:
+        logger.error("Encoded URL is None")
+        raise Exception("Encoded URL is None")
+
+    encrypted_url: str = crypto.generate(
+        width=img_width,
+        height=img_height,
+        smart=is_smart,
+        image_url=encoded_url,
+    )
+
+    safe_url = thumbor_base_url + encrypted_url
+    safe_url = safe_url.strip()
+    logger.info("Encrypted url: %s", encrypted_url)
+    logger.info("Generated URL: %s", safe_url)
+    if is_copy:
+        copy(safe_url)
+    return safe_url
+
+
+class ThumborUrlGenerator:
+    """Generates thumbor urls for one server, reusing a single signer.
+
+    engine selects the signer from ENGINES: libthumbor's CryptoURL or the
+    stdlib FastCryptoURL, which produce the same urls. A cache_size above 0
+    puts an LRU UrlCache of that many urls in front of generate(); any other
+    object with the same get/put interface, such as a DiskUrlCache, can be
+    passed as cache, and with a cache_size too the LRU goes in front of it.
+    presets maps names to Preset objects for generate_preset(). thumbor_keys
+    lists every key generate_all() signs under, e.g. the new and old key
+    while rotating.
+    """
+
+    def __init__(
+        self,
+        thumbor_base_url: str,
+        thumbor_key: Optional[str] = None,
+        engine=DEFAULT_ENGINE,
+        cache_size=0,
+        cache=None,
+        presets: Optional[Dict[str, Preset]] = None,
+        thumbor_keys: Optional[Sequence[str]] = None,
+    ):
+        self.thumbor_base_url = thumbor_base_url
+        self.presets = presets or {}
+        self.thumbor_key = thumbor_key
+        self.crypto = None
+        self.key_ring = KeyRing(thumbor_keys) if thumbor_keys else None
+        if cache_size > 0:
+            lru = UrlCache(cache_size)
+            cache = lru if cache is None else TieredUrlCache(lru, cache)
+        self.cache = cache
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+        if thumbor_key is not None:
+            try:
+                self.crypto = ENGINES[engine](key=thumbor_key)
+            except Exception as err:
+                logger.error(err)
+                raise err
+
+    def generate(
+        self,
+        in_image_url: str,
+        img_width,
+        img_height,
+        is_smart=True,
+        is_unsafe=False,
+    ) -> str:
+        """Generates a safe url, or an unsafe one if is_unsafe or no key is set."""
+        if self.cache is None:
+            return self._generate(
+                in_image_url, img_width, img_height, is_smart, is_unsafe
+            )
+        key = (in_image_url, img_width, img_height, is_smart, is_unsafe)
+        url = self.cache.get(key)
+        if url is None:
+            url = self._generate(
+                in_image_url, img_width, img_height, is_smart, is_unsafe
+            )
+            self.cache.put(key, url)
+        return url
+
+    def _generate(
+        self, in_image_url: str, img_width, img_height, is_smart, is_unsafe
+    ) -> str:
+        """Generates a url without going through the cache."""
+        if is_unsafe or self.crypto is None:
+            return generate_unsafe_url(
+                self.thumbor_base_url,
+                in_image_url,
+                str(img_width),
+                str(img_height),
+                is_smart,
+            )
+        encoded_url = quote_url(in_image_url)
+        encrypted_url: str = self.crypto.generate(
+            width=img_width,
+            height=img_height,
+            smart=is_smart,
+            image_url=encoded_url,
+        )
+        safe_url = (self.thumbor_base_url + encrypted_url).strip()
+        logger.info("Generated URL: %s", safe_url)
+        return safe_url
+
+    def generate_preset(self, in_image_url: str, preset, is_unsafe=False) -> str:
+        """Generates a url with a Preset, or the name of one in self.presets.
+
+        The preset's option path is prebuilt, so only the source is encoded
+        and appended before signing.
+        """
+        preset = self._preset(preset)
+        if self.cache is None:
+            return self._generate_preset(in_image_url, preset, is_unsafe)
+        key = (in_image_url, preset.path, is_unsafe)
+        url = self.cache.get(key)
+        if url is None:
+            url = self._generate_preset(in_image_url, preset, is_unsafe)
+            self.cache.put(key, url)
+        return url
+
+    def generate_presets(
+        self, in_image_url: str, presets: Iterable, is_unsafe=False
+    ) -> List[str]:
+        """Generates the url for each preset (or name), encoding the source once.
+
+        Results are not cached.
+        """
+        encoded_url = quote_url(in_image_url)
+        return [
+            self._sign_preset(encoded_url, self._preset(preset), is_unsafe)
+            for preset in presets
+        ]
+
+    def _preset(self, preset) -> Preset:
+        """Returns preset, looking it up in self.presets if it is a name."""
+        if isinstance(preset, Preset):
+            return preset
+        try:
+            return self.presets[preset]
+        except KeyError:
+            raise ValueError(f"Unknown preset: {preset}") from None
+
+    def _generate_preset(self, in_image_url: str, preset: Preset, is_unsafe) -> str:
+        """Generates a preset url without going through the cache."""
+        return self._sign_preset(quote_url(in_image_url), preset, is_unsafe)
+
+    def _sign_preset(self, encoded_url: str, preset: Preset, is_unsafe) -> str:
+        """Builds the url for an already encoded source with a preset."""
+        path = preset.path + encoded_url
+        if is_unsafe or self.crypto is None:
+            return self.thumbor_base_url + "/unsafe/" + path
+        if isinstance(self.crypto, FastCryptoURL):
+            return self.thumbor_base_url + self.crypto.generate_path(path)
+        return self.thumbor_base_url + self.crypto.generate(
+            width=preset.width,
+            height=preset.height,
+            smart=preset.smart,
+            fit_in=preset.fit_in,
+            image_url=encoded_url,
+        )
+
+    def generate_all(
+        self,
+        in_image_url: str,
+        img_width,
+        img_height,
+        is_smart=True,
+        is_unsafe=False,
+        preset=None,
+    ) -> List[str]:
+        """Generates the url under every key in thumbor_keys, in key order.
+
+        The option path and encoded source are built once and only the HMAC
+        is repeated per key. Unsafe urls are the same for every key, so a
+        single one is returned. Results are not cached.
+        """
+        if is_unsafe:
+            if preset is not None:
+                return [self.generate_preset(in_image_url, preset, True)]
+            return [self.generate(in_image_url, img_width, img_height, is_smart, True)]
+        if self.key_ring is None:
+            raise Exception("No thumbor_keys to sign with")
+        if preset is not None:
+            options = self._preset(preset).path
+        else:
+            options = option_path(img_width, img_height, is_smart)
+        paths = self.key_ring.generate_paths(options + quote_url(in_image_url))
+        return [self.thumbor_base_url + path for path in paths]
+
+    def srcset(
+        self,
+        in_image_url: str,
+        widths: Iterable[int],
+        img_height=0,
+        is_smart=True,
+        is_unsafe=False,
+    ) -> List[Tuple[int, str]]:
+        """Returns (width, url) pairs for each width, encoding the source once."""
+        encoded_url = quote_url(in_image_url)
+        return [
+            (
+                width,
+                self._sign_preset(
+                    encoded_url,
+                    Preset(f"{width}w", width, img_height, is_smart),
+                    is_unsafe,
+                ),
+            )
+            for width in widths
+        ]
+
+
+def format_srcset(entries: Iterable[Tuple[int, str]]) -> str:
+    """Formats (width, url) pairs as an html srcset attribute value."""
+    return ", ".join(f"{url} {width}w" for width, url in entries)
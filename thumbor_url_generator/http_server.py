@@ -0,0 +1,176 @@
+"""Asyncio HTTP signing endpoint, stdlib only.
+
+POST /sign takes a JSON array of records with the keys url, width, height,
+smart, unsafe and preset (as in batch mode, checked the same way), or a
+single record, and returns a JSON array with {"url": ...} or {"error": ...}
+for each record in order.
+GET /metrics returns ServerMetrics in the Prometheus text format.
+Connections are kept alive as per HTTP/1.1.
+"""
+import asyncio
+import json
+import logging
+from http import HTTPStatus
+from typing import Tuple
+
+from .batch import generate_record, record_error
+from .generator import ThumborUrlGenerator
+from .metrics import CONTENT_TYPE, ServerMetrics
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_SIZE = 16 * 1024 * 1024
+# Records of a batch signed between yields to the event loop, well under 1 ms.
+SIGN_CHUNK = 64
+
+
+class HttpSigningServer:
+    """Serves one warm generator over HTTP."""
+
+    def __init__(self, generator: ThumborUrlGenerator, defaults: tuple):
+        self.generator = generator
+        self.defaults = defaults
+        self.metrics = ServerMetrics(generator.cache)
+
+    def sign_record(self, record) -> dict:
+        """Returns {"url": ...} for one record, or {"error": ...}.
+
+        Records failing record_error() are answered with its message. Both
+        those and signing failures are counted in metrics.errors.
+        """
+        error = record_error(record)
+        if error is not None:
+            self.metrics.errors += 1
+            return {"error": error}
+        mode = "unsafe" if record.get("unsafe", self.defaults[3]) else "safe"
+        try:
+            url = self.metrics.timed_sign(
+                mode, lambda: generate_record(self.generator, record, *self.defaults)
+            )
+            return {"url": url}
+        except Exception as err:
+            logger.error("Record failed: %s", err)
+            self.metrics.errors += 1
+            return {"error": str(err)}
+
+    async def route(
+        self, method: str, target: str, body: bytes
+    ) -> Tuple[HTTPStatus, object]:
+        """Returns the status and payload for one request.
+
+        The payload is sent as JSON, or as Prometheus text if it is a str.
+        Batches are signed SIGN_CHUNK records at a time, yielding to the
+        event loop in between so other connections are not held up.
+        """
+        if target == "/metrics" and method == "GET":
+            return HTTPStatus.OK, self.metrics.render()
+        if target != "/sign":
+            return HTTPStatus.NOT_FOUND, {"error": "not found"}
+        if method != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "use POST"}
+        try:
+            records = json.loads(body)
+        except ValueError as err:
+            return HTTPStatus.BAD_REQUEST, {"error": f"invalid JSON: {err}"}
+        if not isinstance(records, list):
+            records = [records]
+        self.metrics.batch_size.observe(len(records))
+        results = [self.sign_record(record) for record in records[:SIGN_CHUNK]]
+        for start in range(SIGN_CHUNK, len(records), SIGN_CHUNK):
+            await asyncio.sleep(0)
+            chunk = records[start : start + SIGN_CHUNK]
+            results += [self.sign_record(record) for record in chunk]
+        return HTTPStatus.OK, results
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        """Answers requests on one connection until it is closed."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    self.respond(writer, HTTPStatus.BAD_REQUEST, {}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = (
+                    connection != "close"
+                    if version == "HTTP/1.1"
+                    else connection == "keep-alive"
+                )
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY_SIZE:
+                    self.respond(
+                        writer,
+                        HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                        {"error": "body too large"},
+                        False,
+                    )
+                    break
+                self.metrics.in_flight += 1
+                try:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.route(method, target, body)
+                    self.respond(writer, status, payload, keep_alive)
+                    await writer.drain()
+                finally:
+                    self.metrics.in_flight -= 1
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def respond(
+        writer: asyncio.StreamWriter, status: HTTPStatus, payload, keep_alive
+    ):
+        """Writes a JSON response, or a Prometheus text one for a str payload."""
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), CONTENT_TYPE
+        else:
+            body, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+
+
+async def serve_http(host: str, port: int, server: HttpSigningServer) -> None:
+    """Serves HTTP requests on host:port forever."""
+    tcp_server = await asyncio.start_server(server.handle, host, port)
+    logger.info("Listening on http://%s:%d", host, port)
+    async with tcp_server:
+        await tcp_server.serve_forever()
+
+
+def run_http(address: str, generator: ThumborUrlGenerator, defaults: tuple) -> None:
+    """Runs the HTTP endpoint on address (HOST:PORT) until interrupted.
+
+    The generator's cache is closed on exit, flushing a DiskUrlCache.
+    """
+    host, _, port = address.rpartition(":")
+    server = HttpSigningServer(generator, defaults)
+    try:
+        asyncio.run(serve_http(host or "127.0.0.1", int(port), server))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if generator.cache is not None:
+            generator.cache.close()
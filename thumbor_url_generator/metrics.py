@@ -0,0 +1,140 @@
+"""Prometheus text format metrics for the long-running modes.
+
+ServerMetrics counts signed urls by mode, keeps histograms of signing
+latency and batch size, tracks in-flight requests and reads the cache
+counters at scrape time. Updates are plain list and dict increments with
+no lock of their own: the asyncio endpoint updates them from its single
+event loop thread and the Unix socket daemon under its locks. Scrapes
+render without any lock, so a counter may be one update behind, which
+Prometheus tolerates; they never wait for signing.
+"""
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from typing import Callable, List, Sequence
+
+PREFIX = "thumbor_url_generator"
+LATENCY_BUCKETS = (
+    5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 1e-1,
+)
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 10000)
+
+
+class Histogram:
+    """Prometheus histogram with fixed upper bounds."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, help_text: str) -> List[str]:
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{bound:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum {self.sum:.9g}")
+        lines.append(f"{name}_count {self.count}")
+        return lines
+
+
+class ServerMetrics:
+    """Request, latency, batch size, cache and in-flight metrics."""
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.requests = {"safe": 0, "unsafe": 0}
+        self.errors = 0
+        self.in_flight = 0
+        self.sign_latency = Histogram(LATENCY_BUCKETS)
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+
+    def timed_sign(self, mode: str, sign: Callable[[], str]) -> str:
+        """Calls sign(), counting it under mode and observing its latency.
+
+        Failures are counted in errors by the caller, which also sees the
+        records rejected before signing.
+        """
+        start = time.perf_counter()
+        url = sign()
+        self.sign_latency.observe(time.perf_counter() - start)
+        self.requests[mode] += 1
+        return url
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {PREFIX}_requests_total Signed urls by mode.",
+            f"# TYPE {PREFIX}_requests_total counter",
+        ]
+        for mode, count in self.requests.items():
+            lines.append(f'{PREFIX}_requests_total{{mode="{mode}"}} {count}')
+        lines += [
+            f"# HELP {PREFIX}_errors_total Records rejected or failed to sign.",
+            f"# TYPE {PREFIX}_errors_total counter",
+            f"{PREFIX}_errors_total {self.errors}",
+            f"# HELP {PREFIX}_in_flight_requests Requests being answered.",
+            f"# TYPE {PREFIX}_in_flight_requests gauge",
+            f"{PREFIX}_in_flight_requests {self.in_flight}",
+        ]
+        lines += self.sign_latency.render(
+            f"{PREFIX}_sign_duration_seconds", "Time to generate one url."
+        )
+        lines += self.batch_size.render(
+            f"{PREFIX}_batch_size", "Records per request or connection."
+        )
+        if self.cache is not None:
+            stats = self.cache.stats()
+            if "entries" in stats:
+                lines += [
+                    f"# HELP {PREFIX}_cache_entries Urls held in the cache.",
+                    f"# TYPE {PREFIX}_cache_entries gauge",
+                    f"{PREFIX}_cache_entries {stats['entries']}",
+                ]
+            for counter in ("hits", "misses", "evictions"):
+                if counter in stats:
+                    lines += [
+                        f"# HELP {PREFIX}_cache_{counter}_total Cache {counter}.",
+                        f"# TYPE {PREFIX}_cache_{counter}_total counter",
+                        f"{PREFIX}_cache_{counter}_total {stats[counter]}",
+                    ]
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def serve_metrics(address: str, metrics: ServerMetrics) -> ThreadingHTTPServer:
+    """Serves GET /metrics on address (HOST:PORT) from a daemon thread.
+
+    Scrapes render without taking the signing lock, see the module docstring.
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    host, _, port = address.rpartition(":")
+    server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), MetricsHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
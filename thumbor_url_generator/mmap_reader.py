@@ -0,0 +1,159 @@
+"""Memory-mapped batch input for huge newline delimited url files.
+
+iter_lines() maps the file and splits it into lines block by block over
+the buffer, so lines are bytes slices, decoded only to strip them (below).
+generate_batch_mmap() keeps them as bytes all the way: BytesUrlEncoder
+percent-encodes to ascii bytes, FastCryptoURL.sign_bytes() signs the bytes
+path and the url is written to a binary output. Only JSON record lines are
+decoded, and go through parse_record() and sign_record() like in
+read_batch() and generate_batch().
+
+Lines are split and stripped like the text path does: they end at \\n,
+\\r\\n or a lone \\r, and lines that may start or end with whitespace
+bytes.strip() keeps (\\x1c-\\x1f or a non-ASCII character) are stripped as
+str. Sources that are not valid utf-8 are encoded byte for byte instead of
+failing to decode.
+"""
+import logging
+import mmap
+from collections import Counter
+from typing import BinaryIO, Iterator, Optional
+
+from .batch import FAILED_URL, parse_record, sign_record
+from .encoding import BytesUrlEncoder
+from .generator import ThumborUrlGenerator
+from .presets import Preset
+from .signer import FastCryptoURL
+
+logger = logging.getLogger(__name__)
+
+# Bytes of the map split into lines at a time.
+BLOCK_SIZE = 1 << 20
+# Output is written in blocks of this many urls.
+WRITE_EVERY = 1000
+# Whitespace to str.strip() but not to bytes.strip(), besides non-ASCII.
+_SEPARATORS = (b"\x1c", b"\x1d", b"\x1e", b"\x1f")
+
+
+def iter_lines(path) -> Iterator[bytes]:
+    """Yields every line of the file at path, stripped.
+
+    The map is split BLOCK_SIZE bytes at a time, cut at the last line end of
+    each block, so only one block is copied out at once. Blocks holding a
+    \\r have their line ends turned into \\n before splitting.
+    """
+    with open(path, "rb") as file:
+        try:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            return
+    with buffer:
+        start, size = 0, len(buffer)
+        while start < size:
+            end = start + BLOCK_SIZE
+            if end >= size:
+                end = size
+            else:
+                newline = max(
+                    buffer.rfind(b"\n", start, end), buffer.rfind(b"\r", start, end)
+                )
+                if newline < 0:
+                    # A line longer than a block.
+                    newline = _find_line_end(buffer, end)
+                # Cut just past the line end, both bytes of a \r\n.
+                if newline < 0:
+                    end = size
+                elif buffer[newline : newline + 2] == b"\r\n":
+                    end = newline + 2
+                else:
+                    end = newline + 1
+            block = buffer[start:end]
+            if b"\r" in block:
+                block = block.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+            lines = block.split(b"\n")
+            if end < size:
+                # The empty string after the block's last line end.
+                lines.pop()
+            if block.isascii() and not any(sep in block for sep in _SEPARATORS):
+                # bytes.strip() strips what str.strip() would.
+                for line in lines:
+                    yield line.strip()
+                start = end
+                continue
+            for line in lines:
+                line = line.strip()
+                if line and (
+                    line[0] > 0x7F
+                    or line[-1] > 0x7F
+                    or 0x1C <= line[0] <= 0x1F
+                    or 0x1C <= line[-1] <= 0x1F
+                ):
+                    # str.strip() also strips these, and non-ASCII spaces.
+                    line = (
+                        line.decode("utf-8", "surrogateescape")
+                        .strip()
+                        .encode("utf-8", "surrogateescape")
+                    )
+                yield line
+            start = end
+
+
+def _find_line_end(buffer, start: int) -> int:
+    """Returns the offset of the first \\n or \\r from start, or -1."""
+    ends = [i for i in (buffer.find(b"\n", start), buffer.find(b"\r", start)) if i >= 0]
+    return min(ends, default=-1)
+
+
+def generate_batch_mmap(
+    in_path,
+    out_file: BinaryIO,
+    generator: ThumborUrlGenerator,
+    preset: Preset,
+    defaults: tuple,
+    errors: Optional[Counter] = None,
+    stats=None,
+) -> int:
+    """Writes one url per line of the file at in_path to out_file, returns the count.
+
+    Bare url lines are signed with preset (the batch default options); JSON
+    record lines are passed to sign_record() with defaults; invalid ones and
+    ones that fail to sign are written as FAILED_URL, both counted in
+    errors. The generator must use the fast engine.
+    """
+    if not isinstance(generator.crypto, (FastCryptoURL, type(None))):
+        raise Exception("--mmap needs the fast engine")
+    if errors is None:
+        errors = Counter()
+    encoder = BytesUrlEncoder()
+    base = generator.thumbor_base_url.encode("utf-8")
+    options = preset.path.encode("ascii")
+    unsafe = defaults[3] or generator.crypto is None
+    sign = None if unsafe else generator.crypto.sign_bytes
+    out: list = []
+    count = 0
+    for line_no, line in enumerate(iter_lines(in_path), start=1):
+        if not line:
+            continue
+        if line.startswith(b"{"):
+            record = parse_record(line, line_no, errors)
+            if record is None:
+                url = FAILED_URL
+            else:
+                url = sign_record(generator, record, defaults, errors)
+            out.append(url.encode("utf-8") + b"\n")
+        else:
+            path = options + encoder(line)
+            if sign is None:
+                out.append(base + b"/unsafe/" + path + b"\n")
+            else:
+                out.append(base + b"/" + sign(path) + b"/" + path + b"\n")
+        count += 1
+        if len(out) >= WRITE_EVERY:
+            out_file.write(b"".join(out))
+            out.clear()
+    out_file.write(b"".join(out))
+    if stats is not None:
+        stats.urls = count
+    return count
+
@@ -0,0 +1,56 @@
+"""Named url presets compiled once into a fixed thumbor option path.
+
+A preset spec is a size followed by flags, e.g. ``200x200 smart`` or
+``1600x0 fit-in``. Presets are configured as ``PRESETS=thumb=200x200 smart,
+hero=1600x0 fit-in`` in the env file or built in code with Preset.
+"""
+import re
+from typing import Dict
+
+from .signer import option_path
+
+SIZE_PATTERN = re.compile(r"^(\d*)x(\d*)$")
+FLAGS = ("smart", "fit-in")
+
+
+class Preset:
+    """A named set of options with its precomputed option path."""
+
+    def __init__(self, name: str, width=0, height=0, smart=False, fit_in=False):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.smart = smart
+        self.fit_in = fit_in
+        self.path = option_path(width, height, smart, fit_in)
+
+    def __repr__(self) -> str:
+        return f"Preset({self.name!r}, {self.path!r})"
+
+    @classmethod
+    def parse(cls, name: str, spec: str) -> "Preset":
+        """Builds a preset from a spec such as 200x200 smart."""
+        width = height = 0
+        flags = set()
+        for token in spec.split():
+            size = SIZE_PATTERN.match(token)
+            if size is not None:
+                width, height = (int(value or 0) for value in size.groups())
+            elif token in FLAGS:
+                flags.add(token)
+            else:
+                raise ValueError(f"Preset {name}: unknown option {token!r}")
+        return cls(name, width, height, "smart" in flags, "fit-in" in flags)
+
+
+def parse_presets(text: str) -> Dict[str, Preset]:
+    """Parses comma separated name=spec entries into presets by name."""
+    presets = {}
+    for entry in text.split(","):
+        if not entry.strip():
+            continue
+        name, sep, spec = entry.partition("=")
+        if not sep or not name.strip():
+            raise ValueError(f"Invalid preset entry: {entry.strip()!r}")
+        presets[name.strip()] = Preset.parse(name.strip(), spec)
+    return presets
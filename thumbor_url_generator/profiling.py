@@ -0,0 +1,220 @@
+"""Per-stage wall/CPU timers for --profile and --stats.
+
+StageTimer accumulates time.perf_counter and time.process_time deltas per
+named stage, optionally into a LatencyHistogram per stage. When disabled,
+stage() is a shared no-op context and patch()/iterate()/writer() return
+their input untouched, so the un-profiled hot paths carry no
+instrumentation.
+"""
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from itertools import count
+from typing import Callable, Iterable, Iterator, List, TextIO, Tuple
+
+_NULL_CONTEXT = nullcontext()
+_END = object()
+
+
+def _bucket(ns: int) -> int:
+    """Returns the histogram bucket of ns: exact below 8, then 4 per power of 2."""
+    bits = ns.bit_length()
+    if bits <= 3:
+        return ns
+    return (bits - 2) * 4 + ((ns >> (bits - 3)) & 3)
+
+
+def _bucket_upper(index: int) -> int:
+    """Returns the exclusive upper bound in ns of a bucket."""
+    if index < 8:
+        return index + 1
+    return (5 + index % 4) << (index // 4 - 1)
+
+
+class LatencyHistogram:
+    """Log-linear latency histogram, O(1) per observation, ~25% resolution."""
+
+    def __init__(self):
+        self.counts: List[int] = [0] * 256
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[_bucket(int(seconds * 1e9))] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, pct: float) -> float:
+        """Returns the upper bound in seconds of the bucket holding pct."""
+        if not self.count:
+            return 0.0
+        rank = self.count * pct / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(_bucket_upper(index) / 1e9, self.max)
+        return self.max
+
+
+class StageTimer:
+    """Cumulative wall time, CPU time and call count per stage.
+
+    With histograms, the wall time of every call is also recorded in a
+    LatencyHistogram per stage. With sample_every above 1 only every Nth
+    call of a stage is timed, and only into its histogram, which keeps the
+    per-call cost to a counter increment for the others. Stages in outer
+    enclose other stages and are left out of the "other" remainder in the
+    report.
+    """
+
+    def __init__(self, enabled=True, histograms=False, sample_every=1):
+        if sample_every > 1:
+            histograms = True
+        self.enabled = enabled
+        self.sample_every = sample_every
+        self.wall = defaultdict(float)
+        self.cpu = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.histograms = defaultdict(LatencyHistogram) if histograms else None
+        self.outer = set()
+        self.started = time.perf_counter()
+        self.patched: List[Tuple[object, str, object]] = []
+
+    def add(self, stage: str, wall: float, cpu: float) -> None:
+        self.wall[stage] += wall
+        self.cpu[stage] += cpu
+        self.calls[stage] += 1
+        if self.histograms is not None:
+            self.histograms[stage].observe(wall)
+
+    def stage(self, stage: str):
+        """Returns a context manager timing its body as stage."""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._stage(stage)
+
+    @contextmanager
+    def _stage(self, stage: str):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - wall, time.process_time() - cpu)
+
+    def wrap(self, stage: str, func: Callable) -> Callable:
+        """Returns func timed as stage."""
+        if self.sample_every > 1:
+            return self._wrap_sampled(stage, func)
+        perf_counter, process_time, add = time.perf_counter, time.process_time, self.add
+
+        @wraps(func)
+        def timed(*args, **kwargs):
+            wall, cpu = perf_counter(), process_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add(stage, perf_counter() - wall, process_time() - cpu)
+
+        return timed
+
+    def _wrap_sampled(self, stage: str, func: Callable) -> Callable:
+        perf_counter, every = time.perf_counter, self.sample_every
+        observe = self.histograms[stage].observe
+        calls = count()
+
+        @wraps(func)
+        def sampled(*args, **kwargs):
+            if next(calls) % every:
+                return func(*args, **kwargs)
+            start = perf_counter()
+            result = func(*args, **kwargs)
+            observe(perf_counter() - start)
+            return result
+
+        return sampled
+
+    def patch(self, owner, attr: str, stage: str) -> None:
+        """Replaces owner.attr (function, method or global) with a timed one."""
+        if not self.enabled:
+            return
+        original = getattr(owner, attr)
+        self.patched.append((owner, attr, original))
+        setattr(owner, attr, self.wrap(stage, original))
+
+    def restore(self) -> None:
+        """Undoes every patch()."""
+        while self.patched:
+            owner, attr, original = self.patched.pop()
+            setattr(owner, attr, original)
+
+    def iterate(self, stage: str, iterable: Iterable) -> Iterable:
+        """Times each step of iterable as stage."""
+        if not self.enabled:
+            return iterable
+        if self.sample_every > 1:
+            return self._iterate_sampled(stage, iter(iterable))
+        return self._iterate(stage, iter(iterable))
+
+    def _iterate(self, stage: str, iterator: Iterator) -> Iterator:
+        while True:
+            wall, cpu = time.perf_counter(), time.process_time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.add(stage, time.perf_counter() - wall, time.process_time() - cpu)
+            yield item
+
+    def _iterate_sampled(self, stage: str, iterator: Iterator) -> Iterator:
+        perf_counter, every = time.perf_counter, self.sample_every
+        observe = self.histograms[stage].observe
+        for calls in count(1):
+            if calls % every:
+                item = next(iterator, _END)
+            else:
+                start = perf_counter()
+                item = next(iterator, _END)
+                observe(perf_counter() - start)
+            if item is _END:
+                return
+            yield item
+
+    def writer(self, stage: str, out_file: TextIO):
+        """Returns out_file with its write() timed as stage."""
+        if not self.enabled:
+            return out_file
+        return _TimedWriter(out_file, self.wrap(stage, out_file.write))
+
+    def report(self, out_file: TextIO) -> None:
+        """Writes the per-stage breakdown, slowest first."""
+        total = time.perf_counter() - self.started
+        out_file.write(
+            f"{'stage':<10} {'calls':>10} {'wall s':>10} {'cpu s':>10} "
+            f"{'wall %':>7} {'us/call':>9}\n"
+        )
+        for stage in sorted(self.wall, key=self.wall.get, reverse=True):
+            wall, calls = self.wall[stage], self.calls[stage]
+            out_file.write(
+                f"{stage:<10} {calls:>10} {wall:>10.4f} {self.cpu[stage]:>10.4f} "
+                f"{wall / total * 100:>7.1f} {wall / calls * 1e6:>9.2f}\n"
+            )
+        other = total - sum(
+            wall for stage, wall in self.wall.items() if stage not in self.outer
+        )
+        out_file.write(f"{'other':<10} {'':>10} {other:>10.4f}\n")
+        out_file.write(f"{'total':<10} {'':>10} {total:>10.4f}\n")
+
+
+class _TimedWriter:
+    def __init__(self, out_file: TextIO, write: Callable):
+        self.out_file = out_file
+        self.write = write
+
+    def __getattr__(self, name):
+        return getattr(self.out_file, name)
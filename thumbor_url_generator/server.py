@@ -0,0 +1,156 @@
+"""Signing daemon over a Unix domain socket, and its client.
+
+The protocol is newline-delimited JSON: each request line is a record with
+the keys url, width, height, smart, unsafe and preset (as in batch mode,
+checked the same way), and each response line is either {"url": ...} or
+{"error": ...}.
+"""
+import json
+import logging
+import os
+import socket
+from collections import Counter
+from pathlib import Path
+from socketserver import StreamRequestHandler, ThreadingMixIn, UnixStreamServer
+from threading import Lock
+from typing import Iterable, Iterator, Optional
+
+from .batch import FAILED_URL, REJECTED_KEY, generate_record, record_error
+from .generator import ThumborUrlGenerator
+from .metrics import ServerMetrics, serve_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class SigningHandler(StreamRequestHandler):
+    """Answers every request line on one connection."""
+
+    def setup(self):
+        super().setup()
+        self.records = 0
+
+    def finish(self):
+        with self.server.metrics_lock:
+            self.server.metrics.batch_size.observe(self.records)
+        super().finish()
+
+    def handle(self):
+        server, metrics = self.server, self.server.metrics
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            self.records += 1
+            with server.metrics_lock:
+                metrics.in_flight += 1
+            try:
+                try:
+                    response = {"url": server.sign(json.loads(line))}
+                except Exception as err:
+                    logger.error("Request failed: %s", err)
+                    response = {"error": str(err)}
+                    with server.metrics_lock:
+                        metrics.errors += 1
+                self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            finally:
+                with server.metrics_lock:
+                    metrics.in_flight -= 1
+
+
+class SigningServer(ThreadingMixIn, UnixStreamServer):
+    """Keeps one warm generator and serves it to every connection.
+
+    Signing and the metrics it updates happen under lock; the other metric
+    updates take metrics_lock, so they never wait for signing. in_flight
+    counts the requests being answered and batch_size the requests made on
+    each connection.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, generator: ThumborUrlGenerator, defaults: tuple):
+        self.generator = generator
+        self.defaults = defaults
+        self.lock = Lock()
+        self.metrics_lock = Lock()
+        self.metrics = ServerMetrics(generator.cache)
+        socket_path = Path(socket_path)
+        if socket_path.is_socket():
+            socket_path.unlink()
+        # The socket hands out signatures, only the owner may connect.
+        umask = os.umask(0o177)
+        try:
+            super().__init__(str(socket_path), SigningHandler)
+        finally:
+            os.umask(umask)
+
+    def sign(self, record: dict) -> str:
+        """Generates the url for one request record.
+
+        Raises ValueError if the record's fields are invalid, see record_error().
+        """
+        error = record_error(record)
+        if error is not None:
+            raise ValueError(error)
+        mode = "unsafe" if record.get("unsafe", self.defaults[3]) else "safe"
+        with self.lock:
+            return self.metrics.timed_sign(
+                mode, lambda: generate_record(self.generator, record, *self.defaults)
+            )
+
+
+def serve(
+    socket_path,
+    generator: ThumborUrlGenerator,
+    defaults: tuple,
+    metrics_address: Optional[str] = None,
+) -> None:
+    """Serves signing requests on socket_path until interrupted.
+
+    With metrics_address (HOST:PORT), GET /metrics is served there too. The
+    generator's cache is closed on exit, flushing a DiskUrlCache.
+    """
+    server = SigningServer(socket_path, generator, defaults)
+    logger.info("Listening on %s", socket_path)
+    if metrics_address is not None:
+        serve_metrics(metrics_address, server.metrics)
+        logger.info("Metrics on http://%s/metrics", metrics_address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        Path(socket_path).unlink(missing_ok=True)
+        if generator.cache is not None:
+            with server.lock:
+                generator.cache.close()
+
+
+def request_urls(
+    socket_path, records: Iterable[dict], errors: Optional[Counter] = None
+) -> Iterator[str]:
+    """Sends records to a running daemon and yields the generated urls.
+
+    Like batch mode, a record the daemon answers with an error yields
+    FAILED_URL; the error is logged and, if errors is given, counted in it
+    as request_failed. Rejected batch records are not sent and yield
+    FAILED_URL too.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(str(socket_path))
+        stream = sock.makefile("rwb")
+        for record in records:
+            if REJECTED_KEY in record:
+                yield FAILED_URL
+                continue
+            stream.write(json.dumps(record).encode("utf-8") + b"\n")
+            stream.flush()
+            response = json.loads(stream.readline())
+            if "error" in response:
+                logger.error("%s: %s", record.get("url"), response["error"])
+                if errors is not None:
+                    errors["request_failed"] += 1
+                yield FAILED_URL
+            else:
+                yield response["url"]
@@ -0,0 +1,83 @@
+"""Sharding of batch input across machines, and merging the shard outputs.
+
+A record belongs to shard crc32(url) % count, so every node picks the same
+records without coordination and repeated source urls land on one node.
+Sharded output lines are <index>\\t<url>, index being the record's position
+in the whole input; merge_shards() interleaves the shard files back into
+input order.
+"""
+import heapq
+import logging
+import zlib
+from argparse import ArgumentTypeError
+from typing import Iterable, Iterator, List, TextIO, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Record key carrying the input index of a sharded record to the output.
+INDEX_KEY = "_index"
+
+
+def parse_shard(text: str) -> Tuple[int, int]:
+    """Parses i/N into (i, N), for argparse."""
+    shard, sep, count = text.partition("/")
+    try:
+        shard, count = int(shard), int(count)
+    except ValueError:
+        raise ArgumentTypeError(f"expected i/N, got {text!r}") from None
+    if not sep or count < 1 or not 0 <= shard < count:
+        raise ArgumentTypeError(f"expected i/N with 0 <= i < N, got {text!r}")
+    return shard, count
+
+
+def shard_of(url: str, count: int) -> int:
+    """Returns the shard of a source url."""
+    return zlib.crc32(url.encode("utf-8")) % count
+
+
+class ShardSelector:
+    """Keeps the records of one shard, tagging each with its input index.
+
+    index is the number of input records read so far, starting at start
+    when resuming.
+    """
+
+    def __init__(self, shard: int, count: int, start=0):
+        self.shard = shard
+        self.count = count
+        self.index = start
+
+    def select(self, records: Iterable[dict]) -> Iterator[dict]:
+        """Yields the records of this shard."""
+        shard, count = self.shard, self.count
+        for record in records:
+            index = self.index
+            self.index = index + 1
+            if shard_of(record["url"], count) == shard:
+                record[INDEX_KEY] = index
+                yield record
+
+
+def _indexed(in_file: TextIO) -> Iterator[Tuple[int, str]]:
+    for line in in_file:
+        index, _, rest = line.partition("\t")
+        yield int(index), rest
+
+
+def merge_shards(in_files: List[TextIO], out_file: TextIO) -> int:
+    """Writes the urls of the shard outputs in input order, returns the count.
+
+    Raises an Exception if an index is missing or repeated, e.g. when a
+    shard file is missing or incomplete; records missing after the highest
+    index seen cannot be detected.
+    """
+    expected = 0
+    for index, rest in heapq.merge(*map(_indexed, in_files)):
+        if index != expected:
+            raise Exception(
+                f"Shard outputs jump from record {expected - 1} to {index}, "
+                "is a shard missing or incomplete?"
+            )
+        out_file.write(rest)
+        expected += 1
+    return expected
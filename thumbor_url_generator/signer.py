@@ -0,0 +1,93 @@
+"""Pure stdlib thumbor url signer.
+
+FastCryptoURL produces the same output as libthumbor's CryptoURL.generate for
+the options this tool supports (width, height, smart, fit_in and image_url), but
+builds the option path directly instead of going through libthumbor's
+generic url composer. KeyRing signs one path under several keys, for key
+rotation.
+"""
+import hashlib
+import hmac
+from base64 import urlsafe_b64encode
+from typing import List, Sequence, Union
+
+
+def option_path(width=0, height=0, smart=False, fit_in=False) -> str:
+    """Returns the thumbor option path, e.g. 300x200/smart/, for the options.
+
+    Mirrors libthumbor: the size is omitted when neither width nor height is
+    set, and values are formatted as given.
+    """
+    has_size = width or height
+    if fit_in and not has_size:
+        raise ValueError(
+            "When using fit-in or full-fit-in, you must specify width and/or height."
+        )
+    path = "fit-in/" if fit_in else ""
+    if has_size:
+        path += "%sx%s/" % (width, height)
+    if smart:
+        path += "smart/"
+    return path
+
+
+class FastCryptoURL:
+    """Signs thumbor urls with hmac/hashlib, a subset of libthumbor's CryptoURL."""
+
+    def __init__(self, key: Union[str, bytes]):
+        if isinstance(key, str):
+            # libthumbor encodes str keys as latin-1, match it byte for byte.
+            key = key.encode("latin-1")
+        self.key = key
+        # Keyed once, copied per signature so the key is not re-padded.
+        self.hmac = hmac.new(key, digestmod=hashlib.sha1)
+
+    def sign(self, path: str) -> str:
+        """Returns the url-safe base64 HMAC-SHA1 signature of path."""
+        signer = self.hmac.copy()
+        signer.update(path.encode("utf-8"))
+        return urlsafe_b64encode(signer.digest()).decode("ascii")
+
+    def sign_bytes(self, path: bytes) -> bytes:
+        """Returns the signature of an already encoded path, as ascii bytes."""
+        signer = self.hmac.copy()
+        signer.update(path)
+        return urlsafe_b64encode(signer.digest())
+
+    def generate(
+        self, width=0, height=0, smart=False, fit_in=False, image_url=None
+    ) -> str:
+        """Generates the signed path /<signature>/<options>/<image_url>."""
+        if image_url is None:
+            raise ValueError("The image_url argument is mandatory.")
+        return self.generate_path(option_path(width, height, smart, fit_in) + image_url)
+
+    def generate_path(self, path: str) -> str:
+        """Signs an already built <options>/<image_url> path."""
+        return "/%s/%s" % (self.sign(path), path)
+
+
+class KeyRing:
+    """Signs a path under several keys, e.g. the new and old key in a rotation.
+
+    The path is encoded once per call; only the HMAC is repeated per key.
+    """
+
+    def __init__(self, keys: Sequence[Union[str, bytes]]):
+        if not keys:
+            raise ValueError("KeyRing needs at least one key.")
+        self.signers = [FastCryptoURL(key) for key in keys]
+
+    def sign_all(self, path: str) -> List[str]:
+        """Returns the signature of path under each key, in key order."""
+        data = path.encode("utf-8")
+        signatures = []
+        for signer in self.signers:
+            mac = signer.hmac.copy()
+            mac.update(data)
+            signatures.append(urlsafe_b64encode(mac.digest()).decode("ascii"))
+        return signatures
+
+    def generate_paths(self, path: str) -> List[str]:
+        """Signs an already built <options>/<image_url> path under each key."""
+        return ["/%s/%s" % (signature, path) for signature in self.sign_all(path)]
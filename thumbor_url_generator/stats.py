@@ -0,0 +1,164 @@
+"""Run summary statistics for --stats: throughput, latency, memory, errors."""
+import resource
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from threading import Event, Thread
+from typing import Callable, Optional, TextIO, Tuple
+
+from .profiling import LatencyHistogram, StageTimer
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+# Time one call in this many per stage for the latency histograms.
+SAMPLE_EVERY = 16
+
+
+class RunStats:
+    """Collects run statistics around a sampling StageTimer.
+
+    The signing loops time one url in SAMPLE_EVERY themselves, see
+    sampler(), so the others only pay a modulo and nothing is patched; the
+    report estimates the total instrumentation cost from a calibration loop.
+    """
+
+    def __init__(self, use_tracemalloc=False):
+        self.timer = StageTimer(sample_every=SAMPLE_EVERY)
+        self.timer.outer.add("url")
+        self.errors: Counter = Counter()
+        self.urls = 0
+        self.cache = None
+        # Urls "signed" and "reused" by --dedupe, summed over the workers.
+        self.dedupe: Counter = Counter()
+        # Worker processes, whose stages and caches are not collected.
+        self.jobs = 1
+        self.call_overhead: Optional[float] = None
+        self.started = time.perf_counter()
+        self.use_tracemalloc = use_tracemalloc
+        if use_tracemalloc:
+            tracemalloc.start()
+        self._stop = Event()
+
+    def start_periodic(self, interval: float, out_file: TextIO = sys.stderr) -> None:
+        """Writes a report to out_file every interval seconds until stopped."""
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.report(out_file)
+
+        Thread(target=loop, daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def sampler(self, stage: str) -> Tuple[int, Callable[[float], None]]:
+        """Returns (every, observe) for timing a loop's calls as stage.
+
+        The loop times the calls whose index is a multiple of every and
+        passes their duration to observe.
+        """
+        return SAMPLE_EVERY, self.timer.histograms[stage].observe
+
+    def measure_overhead(self, samples=32000) -> float:
+        """Returns the estimated seconds spent timing stages so far.
+
+        The per-call cost of the sampling in sampler() loops is calibrated on
+        the first call only, so periodic reports do not repeat the loop.
+        """
+        if self.call_overhead is None:
+
+            def noop():
+                pass
+
+            def sampled():
+                perf_counter, every = time.perf_counter, SAMPLE_EVERY
+                observe = LatencyHistogram().observe
+                for index in range(samples):
+                    if index % every:
+                        noop()
+                    else:
+                        start = perf_counter()
+                        noop()
+                        observe(perf_counter() - start)
+
+            def plain():
+                for _ in range(samples):
+                    noop()
+
+            timings = []
+            for loop in (sampled, plain):
+                start = time.perf_counter()
+                loop()
+                timings.append((time.perf_counter() - start) / samples)
+            self.call_overhead = max(timings[0] - timings[1], 0.0)
+        calls = sum(h.count for h in self.timer.histograms.values()) * SAMPLE_EVERY
+        return self.call_overhead * calls
+
+    def report(self, out_file: TextIO) -> None:
+        """Writes the summary to out_file."""
+        elapsed = time.perf_counter() - self.started
+        urls = self.urls
+        if not urls and "url" in self.timer.histograms:
+            # Still running: estimate from the sampled per-url stage.
+            urls = self.timer.histograms["url"].count * SAMPLE_EVERY
+        out_file.write(
+            f"urls: {urls} in {elapsed:.3f} s, {urls / elapsed:,.0f} urls/s\n"
+        )
+        if self.errors:
+            errors = ", ".join(f"{name}={n}" for name, n in self.errors.items())
+            out_file.write(f"errors: {sum(self.errors.values())} ({errors})\n")
+        else:
+            out_file.write("errors: 0\n")
+
+        if self.jobs > 1:
+            out_file.write(
+                f"latency, cache: not collected from the {self.jobs} --jobs workers\n"
+            )
+        stages = [
+            (stage, histogram)
+            for stage, histogram in sorted(self.timer.histograms.items())
+            if histogram.count
+        ]
+        header = "".join(f"{'p' + str(pct):>9}" for pct in PERCENTILES)
+        if stages:
+            out_file.write(f"{'latency us':<10} {'samples':>10}{header}{'max':>9}\n")
+        for stage, histogram in stages:
+            values = "".join(
+                f"{histogram.percentile(pct) * 1e6:>9.2f}" for pct in PERCENTILES
+            )
+            out_file.write(
+                f"{stage:<10} {histogram.count:>10}{values}"
+                f"{histogram.max * 1e6:>9.2f}\n"
+            )
+
+        if self.cache is not None:
+            stats = self.cache.stats()
+            lookups = stats["hits"] + stats["misses"]
+            ratio = stats["hits"] / lookups if lookups else 0.0
+            out_file.write(
+                f"cache: {stats['hits']} hits, {stats['misses']} misses, "
+                f"hit ratio {ratio:.1%}\n"
+            )
+        if self.dedupe:
+            signed, reused = self.dedupe["signed"], self.dedupe["reused"]
+            total = signed + reused
+            ratio = reused / total if total else 0.0
+            out_file.write(
+                f"dedupe: {signed} signed, {reused} reused, reuse ratio {ratio:.1%}\n"
+            )
+
+        # ru_maxrss is in KiB on Linux.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        out_file.write(f"peak rss: {peak:.1f} MiB (children {children:.1f} MiB)\n")
+        if self.use_tracemalloc:
+            _, traced_peak = tracemalloc.get_traced_memory()
+            out_file.write(f"tracemalloc peak: {traced_peak / 2**20:.1f} MiB\n")
+
+        overhead = self.measure_overhead()
+        out_file.write(
+            f"stats overhead: ~{overhead:.4f} s ({overhead / elapsed:.1%} of run)\n"
+        )
+        out_file.flush()
@@ -0,0 +1,260 @@
+"""Transform mode: adds signed url columns to CSV or JSONL catalogue files.
+
+Rows are streamed in chunks: each chunk's source urls are signed under
+every column's preset (the source is encoded once per row) and the new
+columns are written right after the source column. Memory use depends on
+the chunk size, not the file size; with jobs > 1 at most two chunks per
+worker are in flight.
+"""
+import csv
+import json
+import logging
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+    Union,
+)
+
+from .batch import WorkerPool, chunked, make_generator
+from .generator import DEFAULT_ENGINE, ThumborUrlGenerator
+from .presets import Preset
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "jsonl")
+# Input buffer size for transform files.
+BUFFER_SIZE = 1 << 20
+
+
+def guess_format(path: str) -> str:
+    """Returns jsonl for .jsonl/.ndjson/.json paths and csv otherwise."""
+    if Path(path).suffix.lower() in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    return "csv"
+
+
+def parse_columns(specs: Sequence[str], presets: dict) -> List[Tuple[str, Preset]]:
+    """Parses NAME or NAME=SPEC column specs into (column name, preset) pairs.
+
+    A bare NAME is looked up in presets; NAME=SPEC takes a preset spec such
+    as 300x200 smart.
+    """
+    columns = []
+    for spec in specs:
+        name, sep, options = spec.partition("=")
+        name = name.strip()
+        if sep:
+            columns.append((name, Preset.parse(name, options)))
+        elif name in presets:
+            columns.append((name, presets[name]))
+        else:
+            raise ValueError(f"Unknown preset: {name}")
+    return columns
+
+
+def sign_urls(
+    generator: ThumborUrlGenerator,
+    urls: Iterable[str],
+    presets: Sequence[Preset],
+    is_unsafe=False,
+    sampler: Optional[Tuple[int, Callable]] = None,
+) -> List[List[str]]:
+    """Returns the urls for each preset per source; empty sources stay empty.
+
+    sampler, from RunStats.sampler(), times one source in every.
+    """
+    empty = [""] * len(presets)
+    if sampler is None:
+        return [
+            generator.generate_presets(url, presets, is_unsafe) if url else empty
+            for url in urls
+        ]
+    every, observe = sampler
+    signed = []
+    for index, url in enumerate(urls):
+        if not url:
+            signed.append(empty)
+        elif index % every:
+            signed.append(generator.generate_presets(url, presets, is_unsafe))
+        else:
+            start = time.perf_counter()
+            signed.append(generator.generate_presets(url, presets, is_unsafe))
+            observe(time.perf_counter() - start)
+    return signed
+
+
+def _setup_worker(
+    thumbor_base_url: str,
+    thumbor_key: Optional[str],
+    options: dict,
+    presets: List[Preset],
+    is_unsafe: bool,
+) -> Tuple[ThumborUrlGenerator, List[Preset], bool]:
+    """Builds the generator of a worker process."""
+    generator = make_generator(thumbor_base_url, thumbor_key, **options)
+    return generator, presets, is_unsafe
+
+
+def _sign_chunk(state: tuple, urls: List[str]) -> List[List[str]]:
+    """Signs a chunk of source urls in a worker process."""
+    generator, presets, is_unsafe = state
+    return sign_urls(generator, urls, presets, is_unsafe)
+
+
+class _CsvTransform:
+    """Adds the columns to CSV rows, after the source column of the header."""
+
+    def __init__(self, in_file: TextIO, out_file: TextIO, column: str, names):
+        self.errors: Counter = Counter()
+        self.reader = csv.reader(in_file)
+        self.writer = csv.writer(out_file, lineterminator="\n")
+        header = next(self.reader, None)
+        if header is None:
+            raise Exception("CSV input has no header row")
+        if column not in header:
+            raise Exception(f"CSV input has no {column!r} column")
+        self.index = header.index(column) + 1
+        self.writer.writerow(header[: self.index] + names + header[self.index :])
+
+    def chunks(self, size: int) -> Iterator[Tuple[list, List[str]]]:
+        """Yields (rows, source urls) chunks."""
+        index = self.index - 1
+        for rows in chunked(self.reader, size):
+            yield rows, [row[index] if len(row) > index else "" for row in rows]
+
+    def write(self, rows, signed):
+        """Writes the rows with the signed urls after the source column."""
+        index = self.index
+        self.writer.writerows(
+            row[:index] + urls + row[index:] for row, urls in zip(rows, signed)
+        )
+
+
+class _JsonlTransform:
+    """Adds the keys to JSONL objects, after the source key."""
+
+    def __init__(self, in_file: TextIO, out_file: TextIO, column: str, names):
+        self.in_file = in_file
+        self.out_file = out_file
+        self.column = column
+        self.names = names
+        self.errors: Counter = Counter()
+
+    def records(self) -> Iterator[Union[dict, str]]:
+        """Yields each object line as a dict, and the other lines as they are.
+
+        Lines that are not JSON objects are logged and counted in errors.
+        """
+        for line_no, line in enumerate(self.in_file, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as err:
+                logger.error("Line %d: invalid JSON record: %s", line_no, err)
+                self.errors["invalid_json"] += 1
+                yield line
+                continue
+            if not isinstance(record, dict):
+                logger.error("Line %d: record is not an object", line_no)
+                self.errors["not_object"] += 1
+                yield line
+                continue
+            yield record
+
+    def source(self, record: Union[dict, str]) -> str:
+        """Returns the source url of a record, or "" if it has no string one."""
+        url = record.get(self.column) if isinstance(record, dict) else None
+        return url if isinstance(url, str) else ""
+
+    def chunks(self, size: int) -> Iterator[Tuple[list, List[str]]]:
+        """Yields (records, source urls) chunks."""
+        for records in chunked(self.records(), size):
+            yield records, list(map(self.source, records))
+
+    def write(self, records, signed):
+        """Writes the records with the signed urls after the source key.
+
+        Lines that were not objects are copied unchanged.
+        """
+        column, names = self.column, self.names
+        lines = []
+        for record, urls in zip(records, signed):
+            if isinstance(record, str):
+                lines.append(record if record.endswith("\n") else record + "\n")
+                continue
+            out = {}
+            for key, value in record.items():
+                out[key] = value
+                if key == column:
+                    out.update(zip(names, urls))
+            if column not in record:
+                out.update(zip(names, urls))
+            lines.append(json.dumps(out, ensure_ascii=False) + "\n")
+        self.out_file.write("".join(lines))
+
+
+TRANSFORMS = {"csv": _CsvTransform, "jsonl": _JsonlTransform}
+
+
+def transform_file(
+    in_file: TextIO,
+    out_file: TextIO,
+    file_format: str,
+    column: str,
+    columns: Sequence[Tuple[str, Preset]],
+    thumbor_base_url: str,
+    thumbor_key: Optional[str],
+    is_unsafe=False,
+    jobs=1,
+    chunk_size=1000,
+    engine=DEFAULT_ENGINE,
+    stats=None,
+) -> int:
+    """Copies in_file to out_file with a signed url column per (name, preset).
+
+    The new columns follow column, the source url column. Returns the number
+    of rows written. JSONL lines that are not objects are logged and copied
+    unchanged, and counted in stats.errors if stats is given.
+    """
+    names = [name for name, _ in columns]
+    presets = [preset for _, preset in columns]
+    options = {"engine": engine}
+    transform = TRANSFORMS[file_format](in_file, out_file, column, names)
+    count = 0
+    if jobs > 1:
+        if stats is not None:
+            stats.jobs = jobs
+        pending = deque()
+        setup_args = (thumbor_base_url, thumbor_key, options, presets, is_unsafe)
+        with WorkerPool(jobs, _setup_worker, setup_args, _sign_chunk) as pool:
+            for rows, urls in transform.chunks(chunk_size):
+                pending.append((rows, pool.apply_async(urls)))
+                if len(pending) >= 2 * jobs:
+                    rows, result = pending.popleft()
+                    transform.write(rows, result.get())
+                    count += len(rows)
+            while pending:
+                rows, result = pending.popleft()
+                transform.write(rows, result.get())
+                count += len(rows)
+    else:
+        generator = make_generator(thumbor_base_url, thumbor_key, **options)
+        sampler = stats.sampler("url") if stats is not None else None
+        for rows, urls in transform.chunks(chunk_size):
+            signed = sign_urls(generator, urls, presets, is_unsafe, sampler)
+            transform.write(rows, signed)
+            count += len(rows)
+    if stats is not None:
+        stats.urls = (count - sum(transform.errors.values())) * len(presets)
+        stats.errors.update(transform.errors)
+    return count
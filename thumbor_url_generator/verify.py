@@ -0,0 +1,129 @@
+"""Verify mode: checks signed urls against the current key(s).
+
+Each url is split into its signature and signed path, the HMAC is
+recomputed from the keyed state of every key in the KeyRing and compared
+with hmac.compare_digest. A url is valid if the first key signed it,
+old_key if another key did, and otherwise mismatch, unsafe or malformed.
+"""
+import binascii
+import hmac
+import logging
+import time
+from base64 import urlsafe_b64decode
+from collections import Counter
+from typing import Iterable, Iterator, List, Sequence, TextIO, Tuple
+
+from .batch import WorkerPool, chunked
+from .signer import KeyRing
+
+logger = logging.getLogger(__name__)
+
+VALID = "valid"
+OLD_KEY = "old_key"
+MISMATCH = "mismatch"
+UNSAFE = "unsafe"
+MALFORMED = "malformed"
+
+
+def split_signed_url(url: str, thumbor_base_url: str = "") -> Tuple[str, str]:
+    """Returns (signature, path) for a url of the form <base>/<signature>/<path>.
+
+    The base is stripped if the url starts with it, otherwise everything up
+    to the first / after the host. Raises ValueError if there is no path.
+    """
+    if thumbor_base_url and url.startswith(thumbor_base_url):
+        rest = url[len(thumbor_base_url) :]
+    else:
+        scheme_end = url.find("://")
+        start = url.find("/", scheme_end + 3) if scheme_end >= 0 else 0
+        rest = url[start:] if start >= 0 else ""
+    signature, _, path = rest.lstrip("/").partition("/")
+    if not signature or not path:
+        raise ValueError(f"not a signed thumbor url: {url}")
+    return signature, path
+
+
+class UrlVerifier:
+    """Checks signed urls against keys, the current key first."""
+
+    def __init__(self, thumbor_base_url: str, thumbor_keys: Sequence[str]):
+        self.thumbor_base_url = thumbor_base_url
+        self.key_ring = KeyRing(thumbor_keys)
+
+    def verify(self, url: str) -> str:
+        """Returns valid, old_key, mismatch, unsafe or malformed for one url."""
+        try:
+            signature, path = split_signed_url(url, self.thumbor_base_url)
+        except ValueError as err:
+            logger.debug("%s", err)
+            return MALFORMED
+        if signature == "unsafe":
+            return UNSAFE
+        try:
+            digest = urlsafe_b64decode(signature)
+        except (binascii.Error, ValueError):
+            return MALFORMED
+        data = path.encode("utf-8")
+        for index, signer in enumerate(self.key_ring.signers):
+            mac = signer.hmac.copy()
+            mac.update(data)
+            if hmac.compare_digest(mac.digest(), digest):
+                return VALID if index == 0 else OLD_KEY
+        return MISMATCH
+
+
+def read_urls(in_file: TextIO) -> Iterator[str]:
+    """Yields one url per non-empty line."""
+    for line in in_file:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def _verify_chunk(verifier: UrlVerifier, chunk: List[str]) -> List[Tuple[str, str]]:
+    """Returns (status, url) for each url of a chunk in a worker process."""
+    return [(verifier.verify(url), url) for url in chunk]
+
+
+def verify_batch(
+    urls: Iterable[str],
+    out_file: TextIO,
+    thumbor_base_url: str,
+    thumbor_keys: Sequence[str],
+    jobs=1,
+    chunk_size=1000,
+    stats=None,
+) -> Counter:
+    """Writes <status>\\t<url> for every url that is not valid, returns the counts.
+
+    With jobs > 1 the urls are sent in chunks to a process pool; output
+    keeps the input order. stats, a RunStats, gets the url count.
+    """
+    counts: Counter = Counter()
+    if jobs > 1:
+        if stats is not None:
+            stats.jobs = jobs
+        setup_args = (thumbor_base_url, thumbor_keys)
+        with WorkerPool(jobs, UrlVerifier, setup_args, _verify_chunk) as pool:
+            for results in pool.imap(chunked(urls, chunk_size)):
+                for status, url in results:
+                    counts[status] += 1
+                    if status != VALID:
+                        out_file.write(f"{status}\t{url}\n")
+    else:
+        verifier = UrlVerifier(thumbor_base_url, thumbor_keys)
+        # With stats, one url in every is timed as the url stage.
+        every, observe = stats.sampler("url") if stats is not None else (0, None)
+        for index, url in enumerate(urls):
+            if observe is None or index % every:
+                status = verifier.verify(url)
+            else:
+                start = time.perf_counter()
+                status = verifier.verify(url)
+                observe(time.perf_counter() - start)
+            counts[status] += 1
+            if status != VALID:
+                out_file.write(f"{status}\t{url}\n")
+    if stats is not None:
+        stats.urls = sum(counts.values())
+    return counts